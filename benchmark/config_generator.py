@@ -0,0 +1,107 @@
+import os
+import random
+from typing import Optional, Literal, List
+
+import yaml
+
+
+class ConfigGenerator:
+    '''ConfigGenerator
+
+    Deterministic generator of synthetic configuration trees for benchmarks.
+    The same seed and size always produce the same configuration.
+
+    :param n_leaves: Approximate number of leaf values per configuration.
+    :type n_leaves: int, optional, defaults to 1000
+
+    :param seed: Random seed.
+    :type seed: int, optional, defaults to 0
+
+    '''
+    shapes = ('wide', 'deep', 'list_heavy', 'multi_env')
+    envs = ('DEV', 'NON_PROD', 'PROD')
+
+    def __init__(self,
+                 n_leaves: Optional[int] = 1000,
+                 seed: Optional[int] = 0):
+        self.n_leaves = n_leaves
+        self.seed = seed
+
+    def _leaf(self, rng: random.Random) -> object:
+        kind = rng.randrange(6)
+        if kind == 0:
+            return rng.randrange(100000)
+        elif kind == 1:
+            return round(rng.random() * 1000, 3)
+        elif kind == 2:
+            return rng.random() < 0.5
+        elif kind == 3:
+            return None
+        return f'value_{rng.randrange(100000)}'
+
+    def wide(self, rng: random.Random, n_leaves: int) -> dict:
+        '''Sections of many flat keys, about 100 keys per section.
+        '''
+        config = dict()
+        for i in range(n_leaves):
+            config.setdefault(f'section_{i // 100}', dict())[f'key_{i}'] = self._leaf(rng)
+        return config
+
+    def deep(self, rng: random.Random, n_leaves: int, depth: int = 8) -> dict:
+        '''A 4-ary tree of nested dictionaries, depth levels deep with 4 leaves at the bottom of each branch.
+        '''
+        config = dict()
+        for i in range(0, n_leaves, 4):
+            group = i // 4
+            node = config
+            for level in range(depth):
+                node = node.setdefault(f'level_{level}_{(group // 4 ** level) % 4}', dict())
+            for j in range(min(4, n_leaves - i)):
+                node[f'key_{i + j}'] = self._leaf(rng)
+        return config
+
+    def list_heavy(self, rng: random.Random, n_leaves: int) -> dict:
+        '''Long lists of scalars and lists of small dictionaries.
+        '''
+        n_scalars = n_leaves // 2
+        n_records = (n_leaves - n_scalars) // 3
+        return {'allowlist': [f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}' for i in range(n_scalars)],
+                'records': [{'name': f'record_{i}', 'enabled': rng.random() < 0.5, 'weight': self._leaf(rng)}
+                            for i in range(n_records)]}
+
+    def multi_env(self, rng: random.Random, n_leaves: int) -> dict:
+        '''INDEP_ENV base with a DEP_ENV override of about 10% of the keys for each environment.
+        '''
+        base = self.wide(rng, n_leaves)
+        dep_env = dict()
+        for env in self.envs:
+            override = dict()
+            for section, values in base.items():
+                for key in values:
+                    if rng.random() < 0.1:
+                        override.setdefault(section, dict())[key] = self._leaf(rng)
+            dep_env[env] = override
+        return {'INDEP_ENV': base, 'DEP_ENV': dep_env}
+
+    def generate(self,
+                 shape: Literal['wide', 'deep', 'list_heavy', 'multi_env'],
+                 file_index: Optional[int] = 0) -> dict:
+        '''Returns one configuration of the given shape.
+        '''
+        rng = random.Random(f'{self.seed}-{shape}-{file_index}')
+        return getattr(self, shape)(rng, self.n_leaves)
+
+    def write(self,
+              config_dir: str,
+              shape: Literal['wide', 'deep', 'list_heavy', 'multi_env'],
+              n_files: Optional[int] = 1) -> List[str]:
+        '''Write n_files configurations of the given shape as YAML files and returns their file names.
+        '''
+        os.makedirs(config_dir, exist_ok=True)
+        file_names = list()
+        for i in range(n_files):
+            file_name = f'{shape.upper()}_{i}.yaml'
+            with open(os.path.join(config_dir, file_name), 'w') as f:
+                yaml.dump(self.generate(shape, file_index=i), f, sort_keys=False)
+            file_names.append(file_name)
+        return file_names
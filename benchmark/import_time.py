@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Optional, Dict, List, Tuple
+
+
+# Import statement: modules it must not import, they are only imported when first used
+IMPORT_TARGETS = {'import util.config_loader': ('yaml', 'pytz', 'tkinter', 'tracemalloc'),
+                  'from util.config_loader import ConfigLoader': ('yaml', 'pytz', 'tkinter', 'tracemalloc'),
+                  'from util.config_schema import ConfigSchema': ('yaml', 'pytz', 'tkinter', 'tracemalloc'),
+                  'from util.logger import LogCollector': ('yaml', 'pytz', 'tkinter', 'orjson')}
+
+# Budget of one import statement, well above the deferred imports and below importing PyYAML and pytz eagerly
+DEFAULT_MAX_MS = 100.0
+
+_repo_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    '''Returns (module, depth, cumulative microseconds) of every line written by python -X importtime.
+    '''
+    imports = list()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            # The header line, 'self [us] | cumulative | imported package'
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        imports.append((module, depth, int(fields[1])))
+    return imports
+
+
+def _run_importtime(code: str,
+                    cwd: Optional[str] = None) -> List[Tuple[str, int, int]]:
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=_repo_dir if cwd is None else cwd,
+                            capture_output=True,
+                            text=True,
+                            check=True)
+    return parse_importtime(result.stderr)
+
+
+def measure(statement: str,
+            repeat: Optional[int] = 5,
+            cwd: Optional[str] = None) -> Dict[str, object]:
+    '''Time one import statement in fresh interpreters.
+
+    Modules imported at interpreter startup are excluded, so the time only covers what the statement imports.
+    A first untimed run writes the bytecode caches, the timed runs import from precompiled sources.
+
+    :param statement: Import statement, e.g. 'from util.config_loader import ConfigLoader'.
+    :type statement: str
+
+    :param repeat: Number of timed runs.
+    :type repeat: int, optional, defaults to 5
+
+    :param cwd: Directory the modules are imported from, e.g. a copy with only precompiled .pyc files.
+                If None, the repository.
+    :type cwd: str, optional, defaults to None
+
+    :rtype: dict
+    :return: {'median_ms', 'min_ms', 'max_ms', 'repeat', 'modules'}
+
+    '''
+    startup_modules = {module for module, depth, cumulative_us in _run_importtime('pass', cwd)}
+    _run_importtime(statement, cwd)
+
+    durations = list()
+    modules = list()
+    for _ in range(repeat):
+        imports = _run_importtime(statement, cwd)
+        durations.append(sum(cumulative_us for module, depth, cumulative_us in imports
+                             if depth == 0 and module not in startup_modules) / 1000)
+        modules = [module for module, depth, cumulative_us in imports if module not in startup_modules]
+    return {'median_ms': statistics.median(durations),
+            'min_ms': min(durations),
+            'max_ms': max(durations),
+            'repeat': repeat,
+            'modules': modules}
+
+
+def check(results: Dict[str, Dict[str, object]],
+          max_ms: Optional[float] = None,
+          baseline: Optional[Dict[str, Dict[str, object]]] = None,
+          threshold: Optional[float] = 0.2) -> List[str]:
+    '''Returns the statements which import a deferred module, take longer than max_ms,
+    or are slower than the baseline by more than threshold, e.g. 0.2 for 20%.
+    '''
+    regressions = list()
+    for statement, result in results.items():
+        deferred = [module for module in IMPORT_TARGETS.get(statement, ())
+                    if any(m == module or m.startswith(f'{module}.') for m in result['modules'])]
+        if deferred:
+            regressions.append(f'{statement}: imports {", ".join(deferred)}')
+        if max_ms is not None and result['median_ms'] > max_ms:
+            regressions.append(f'{statement}: {result["median_ms"]:.1f} ms > {max_ms:.1f} ms')
+        if baseline is not None and statement in baseline:
+            ratio = result['median_ms'] / baseline[statement]['median_ms']
+            if ratio > 1 + threshold:
+                regressions.append(f'{statement}: {ratio:.2f}x baseline')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Check the import time of the headless modules with python -X importtime.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs of each import')
+    parser.add_argument('--max-ms', type=float, default=DEFAULT_MAX_MS, help='Fail if an import takes longer than this, 0 to disable')
+    parser.add_argument('--output', default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='Compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slow down against the baseline, 0.2 for 20%%')
+    args = parser.parse_args(argv)
+
+    results = dict()
+    for statement in IMPORT_TARGETS:
+        results[statement] = measure(statement, repeat=args.repeat)
+        print(f'{statement:<50} {results[statement]["median_ms"]:>8.2f} ms', file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    regressions = check(results, max_ms=args.max_ms or None, baseline=baseline, threshold=args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    if regressions:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
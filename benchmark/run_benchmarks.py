@@ -0,0 +1,242 @@
+import io
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+from typing import Optional, Callable, Dict, List
+
+from util.config_loader import BaseConfigLoader, ConfigLoader, ConfigMelter
+from util.config_index import ConfigIndex
+from util.config_discovery import ConfigDiscovery
+from util.config_converter import ConfigConverter
+from util.logger import LogCollector, Formatter, JsonFormatter
+from benchmark.config_generator import ConfigGenerator
+
+
+class _TreeviewStub:
+    '''Headless stand-in for ttk.Treeview, records inserted rows without a display.
+    '''
+    def __init__(self):
+        self.rows = dict()
+
+    def insert(self, parent, index, iid, text, values, open=False, tags=()):
+        self.rows[iid] = (parent, text, values)
+
+    def item(self, iid, **kwargs):
+        pass
+
+
+class _ButtonStub:
+    def configure(self, **kwargs):
+        pass
+
+
+def _make_editor(edited_config_dict: dict, output_config_dir: str):
+    '''Returns a ConfigEditor without its window, with just the state ConfigEditor._add_brunch
+    and ConfigEditor._action_btn_save use, including the pages of long lists.
+    '''
+    from config_editor.config_editor import ConfigEditor
+    editor = object.__new__(ConfigEditor)
+    editor.tv = _TreeviewStub()
+    editor.index = ConfigIndex()
+    editor.values_for_key = ['', 'key']
+    editor.values_for_page = ['', 'page']
+    editor.list_page_size = 1000
+    editor.list_key_prefix = '-LIST-: '
+    editor._ConfigEditor__edited_iids = set()
+    editor._ConfigEditor__not_default_iids = set()
+    editor._ConfigEditor__paged_lists = dict()
+    editor._ConfigEditor__pages = dict()
+    editor._ConfigEditor__page_rows = dict()
+    editor.edited_config_dict = edited_config_dict
+    editor._output_config_dir = output_config_dir
+    editor._config_file_names_by_key = dict()
+    editor.btn_undo_all = _ButtonStub()
+    editor.btn_save = _ButtonStub()
+    return editor
+
+
+class BenchmarkSuite:
+    '''BenchmarkSuite
+
+    Time every hot path on synthetic configurations written by ConfigGenerator.
+
+    :param n_leaves: Approximate number of leaf values per configuration file.
+    :type n_leaves: int, optional, defaults to 10000
+
+    :param n_files: Number of configuration files of each shape.
+    :type n_files: int, optional, defaults to 4
+
+    :param repeat: Number of timed runs of each benchmark.
+    :type repeat: int, optional, defaults to 5
+
+    :param seed: Random seed of the generator.
+    :type seed: int, optional, defaults to 0
+
+    '''
+    def __init__(self,
+                 n_leaves: Optional[int] = 10000,
+                 n_files: Optional[int] = 4,
+                 repeat: Optional[int] = 5,
+                 seed: Optional[int] = 0):
+        self.n_leaves = n_leaves
+        self.n_files = n_files
+        self.repeat = repeat
+        self.seed = seed
+        self.generator = ConfigGenerator(n_leaves=n_leaves, seed=seed)
+
+    def _time(self,
+              func: Callable,
+              setup: Optional[Callable] = None) -> Dict[str, float]:
+        durations = list()
+        for _ in range(self.repeat):
+            args = setup() if setup is not None else tuple()
+            start = time.perf_counter()
+            func(*args)
+            durations.append(time.perf_counter() - start)
+        return {'median_s': statistics.median(durations),
+                'min_s': min(durations),
+                'max_s': max(durations),
+                'repeat': self.repeat}
+
+    def run(self,
+            names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        '''Returns timings of every benchmark, or only the ones whose name contains one of names.
+        '''
+        from config_editor.config_editor import ConfigEditor
+
+        results = dict()
+
+        def bench(name, func, setup=None):
+            if names and not any(n in name for n in names):
+                return
+            results[name] = self._time(func, setup)
+            print(f'{name:<40} {results[name]["median_s"] * 1000:>10.2f} ms', file=sys.stderr)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            shape_dirs = dict()
+            for shape in ConfigGenerator.shapes:
+                shape_dirs[shape] = os.path.join(temp_dir, shape) + os.sep
+                self.generator.write(shape_dirs[shape], shape, n_files=self.n_files)
+            output_dir = os.path.join(temp_dir, 'output') + os.sep
+            os.makedirs(output_dir)
+
+            for shape in ConfigGenerator.shapes:
+                bench(f'BaseConfigLoader.load[{shape}]',
+                      lambda d=shape_dirs[shape]: BaseConfigLoader(config_dir=d).load())
+
+            for shape in ConfigGenerator.shapes:
+                json_dir = os.path.join(temp_dir, f'{shape}_json') + os.sep
+                ConfigConverter(config_dir=shape_dirs[shape], output_config_dir=json_dir, to_format='json').convert()
+                bench(f'BaseConfigLoader.load[{shape},json]',
+                      lambda d=json_dir: BaseConfigLoader(config_dir=d, discovery=ConfigDiscovery(include=('*.json',))).load())
+
+            for env in ConfigGenerator.envs:
+                bench(f'ConfigLoader.load[multi_env,{env}]',
+                      lambda env=env: ConfigLoader(config_dir=shape_dirs['multi_env'], running_env=env).load())
+            bench('ConfigLoader.load_all_envs[multi_env]',
+                  lambda: ConfigLoader(config_dir=shape_dirs['multi_env']).load_all_envs())
+
+            multi_env = self.generator.generate('multi_env')
+            bench('ConfigLoader.deep_update[multi_env]',
+                  ConfigLoader.deep_update,
+                  setup=lambda: (copy.deepcopy(multi_env['INDEP_ENV']), multi_env['DEP_ENV']['PROD']))
+
+            configs = {shape: self.generator.generate(shape) for shape in ConfigGenerator.shapes}
+            for shape, config in configs.items():
+                bench(f'ConfigMelter.melt[{shape}]',
+                      lambda config=config: ConfigMelter().melt(config))
+
+            for shape, config in configs.items():
+                config_list = ConfigMelter().melt(config)
+                # As _init_branch, the elements of long lists go to pages which are not expanded
+                paged_lists = _make_editor(dict(), output_dir)._get_paged_lists(shape, config)
+                bench(f'ConfigEditor._add_brunch[{shape}]',
+                      lambda editor, shape=shape, config_list=config_list, paged_lists=paged_lists: ConfigEditor._add_brunch(editor, root_name=shape, config_list=config_list, paged_lists=paged_lists),
+                      setup=lambda: (_make_editor(dict(), output_dir),))
+
+            bench('ConfigEditor._action_btn_save[all]',
+                  ConfigEditor._action_btn_save.__wrapped__,
+                  setup=lambda: (_make_editor(configs, output_dir),))
+
+            for log_format in ('text', 'json'):
+                log_collector = LogCollector(logger_name=f'benchmark_{log_format}',
+                                             print_log=False,
+                                             write_log=False,
+                                             log_format=log_format)
+                handler = logging.StreamHandler(io.StringIO())
+                if log_format == 'json':
+                    handler.setFormatter(JsonFormatter())
+                else:
+                    handler.setFormatter(Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+                log_collector.logger.addHandler(handler)
+                messages = [f'config loaded {i}' if i % 2 else {'file': f'FILE_{i}', 'changed': i} for i in range(10000)]
+                bench(f'LogCollector.collect[{log_format},10000]',
+                      lambda log_collector=log_collector: [log_collector.collect('info', m) for m in messages])
+        return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    '''Returns the benchmarks whose median is slower than the baseline by more than threshold, e.g. 0.2 for 20%.
+    '''
+    regressions = list()
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median_s'] / baseline[name]['median_s']
+        print(f'{name:<40} {ratio:>6.2f}x baseline', file=sys.stderr)
+        if ratio > 1 + threshold:
+            regressions.append(f'{name}: {ratio:.2f}x baseline')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark loading, merging, melting, tree building, saving and logging.')
+    parser.add_argument('--n-leaves', type=int, default=10000, help='Approximate number of leaf values per file')
+    parser.add_argument('--n-files', type=int, default=4, help='Number of files of each shape')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs of each benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the generator')
+    parser.add_argument('--only', nargs='*', default=None, help='Run only benchmarks whose name contains one of these')
+    parser.add_argument('--output', default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='Compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slow down against the baseline, 0.2 for 20%%')
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(n_leaves=args.n_leaves,
+                           n_files=args.n_files,
+                           repeat=args.repeat,
+                           seed=args.seed)
+    results = suite.run(names=args.only)
+    report = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'n_leaves': args.n_leaves,
+                       'n_files': args.n_files,
+                       'repeat': args.repeat,
+                       'seed': args.seed},
+              'results': results}
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,16 @@
+import os
+import re
 import copy
+import functools
 from typing import Optional, List
 import tkinter as tk
 from tkinter import ttk, messagebox
-import yaml
 from util.config_loader import BaseConfigLoader, ConfigMelter
+from util.config_formats import get_format
+from util.config_index import ConfigIndex
+from util.config_diff import ConfigDiff
+from util.config_schema import ConfigSchema
+from util.instrumentation import span
 
 
 class ConfigEditor(tk.Tk):
@@ -11,7 +18,8 @@ class ConfigEditor(tk.Tk):
                  config_dir: str,
                  config_file_names: Optional[List[str]] = None,
                  output_config_dir: Optional[str] = None,
-                 default_config_dir: Optional[str] = None):
+                 default_config_dir: Optional[str] = None,
+                 schema: Optional[ConfigSchema] = None):
 
         super().__init__()
 
@@ -20,10 +28,17 @@ class ConfigEditor(tk.Tk):
         # ---------------------------------------------------------------------------------------------------
         self.key_seperator = '/'
         self.values_for_key = ['', 'key']
+        self.values_for_page = ['', 'page']
+        self.list_page_size = 1000
         self.list_key_prefix = '-LIST-: '
         self.list_value_for_cbb_boolean = [True, False]
         self.font = 'Calibri'
         self.font_size = 12
+        self.search_delay_ms = 150
+        # A search matching more items shows only this many, filtering stays fast on large trees
+        self.search_max_matches = 1000
+        self.edited_row_background = '#fff2b3'
+        self.not_default_row_foreground = '#1a5fb4'
 
         # ---------------------------------------------------------------------------------------------------
         # Initial Class Attributes
@@ -32,12 +47,15 @@ class ConfigEditor(tk.Tk):
         self._config_file_names = config_file_names
         self._output_config_dir = output_config_dir
         self._default_config_dir = default_config_dir
+        self.schema = schema
 
         # ---------------------------------------------------------------------------------------------------
         # Read all config files
         # ---------------------------------------------------------------------------------------------------
-        self.config_dict = BaseConfigLoader(config_dir=self._config_dir,
-                                            config_file_names=self._config_file_names).load()
+        config_loader = BaseConfigLoader(config_dir=self._config_dir,
+                                         config_file_names=self._config_file_names)
+        self.config_dict = config_loader.load()
+        self._config_file_names_by_key = config_loader.config_file_names_by_key
 
         if self._output_config_dir is None:
             self._output_config_dir = config_dir
@@ -50,7 +68,30 @@ class ConfigEditor(tk.Tk):
         else:
             self.default_config_dict = None
 
+        if self.schema is None and self.default_config_dict is not None:
+            self.schema = ConfigSchema.from_config(self.default_config_dict,
+                                                   key_seperator=self.key_seperator,
+                                                   list_key_prefix=self.list_key_prefix)
+
         self.edited_config_dict = copy.deepcopy(self.config_dict)
+        self.index = ConfigIndex()
+        self.__search_after_id = None
+        self.diff_loaded = None
+        self.diff_default = None
+        self.__edited_iids = set()
+        self.__not_default_iids = set()
+        # Lists longer than list_page_size are shown as pages, {list iid: [page iids]} and {page iid: (list iid, start)}
+        self.__paged_lists = dict()
+        self.__pages = dict()
+        # Rows of the pages not expanded yet, {page iid: [(parent, iid, text, values, open)]}
+        self.__page_rows = dict()
+        # Rows selected by Select Matches in pages not expanded yet, selected once their page is expanded
+        self.__pending_selection = set()
+        self.__selection = set()
+        # Previous and set values of each bulk edit, [[(keys, previous value, value)]]
+        self.__bulk_edits = list()
+        # Whether the type and value widgets set the value of several selected keys
+        self.__is_bulk_input = False
 
         # ---------------------------------------------------------------------------------------------------
         # Create GUI
@@ -101,10 +142,11 @@ class ConfigEditor(tk.Tk):
         self.tv = ttk.Treeview(self.frm_tv,
                                columns=('Value', 'Type'),
                                height=100,
-                               selectmode='browse',
+                               selectmode='extended',
                                style='big.Treeview')
 
         self.tv.bind('<ButtonRelease-1>', func=self._action_tk_click_edit)
+        self.tv.bind('<<TreeviewOpen>>', func=self._action_tk_open_page)
 
         sb_h = ttk.Scrollbar(self.frm_tv, orient=tk.HORIZONTAL)
         sb_h.config(command=self.tv.xview)
@@ -120,6 +162,8 @@ class ConfigEditor(tk.Tk):
         self.tv.heading('#0', text='', anchor=tk.CENTER)
         self.tv.heading('Value', text='Value', anchor=tk.CENTER)
         self.tv.heading('Type', text='Type', anchor=tk.CENTER)
+        self.tv.tag_configure('edited', background=self.edited_row_background)
+        self.tv.tag_configure('not_default', foreground=self.not_default_row_foreground)
 
         sb_h.pack(side=tk.BOTTOM, fill=tk.X)
         self.tv.pack(side=tk.LEFT, fill=tk.BOTH)
@@ -127,8 +171,70 @@ class ConfigEditor(tk.Tk):
 
     def _create_gui_inside_frame_edit(self):
         self.__rbt_dtype = tk.StringVar()
+        self.__rbt_search_mode = tk.StringVar(value='substring')
+        self.__rbt_view = tk.StringVar(value='all')
         self.entry_value_str_var = tk.StringVar()
         self.entry_select_status_str_var = tk.StringVar()
+        self.entry_search_str_var = tk.StringVar()
+        self.entry_find_str_var = tk.StringVar()
+        self.entry_replace_str_var = tk.StringVar()
+        self.__cbt_find_regex = tk.BooleanVar(value=False)
+
+        self.frm_search = ttk.Frame(self.frm_edit)
+
+        self.lab_search = ttk.Label(self.frm_search,
+                                    text='Search: ',
+                                    anchor=tk.W,
+                                    style='bigbold.TLabel')
+
+        self.entry_search = ttk.Entry(self.frm_search,
+                                      textvariable=self.entry_search_str_var,
+                                      # style='big.TEntry',
+                                      font=self.entry_font)
+        self.entry_search_str_var.trace_add('write', self._action_entry_search)
+
+        self.rbt_search_substring = ttk.Radiobutton(self.frm_search,
+                                                    command=self._action_entry_search,
+                                                    text='contains',
+                                                    variable=self.__rbt_search_mode,
+                                                    value='substring',
+                                                    style='big.TRadiobutton')
+
+        self.rbt_search_prefix = ttk.Radiobutton(self.frm_search,
+                                                 command=self._action_entry_search,
+                                                 text='starts with',
+                                                 variable=self.__rbt_search_mode,
+                                                 value='prefix',
+                                                 style='big.TRadiobutton')
+
+        self.frm_view = ttk.Frame(self.frm_edit)
+
+        self.lab_view = ttk.Label(self.frm_view,
+                                  text='Show: ',
+                                  anchor=tk.W,
+                                  style='bigbold.TLabel')
+
+        self.rbt_view_all = ttk.Radiobutton(self.frm_view,
+                                            command=self._filter_tree,
+                                            text='all keys',
+                                            variable=self.__rbt_view,
+                                            value='all',
+                                            style='big.TRadiobutton')
+
+        self.rbt_view_edited = ttk.Radiobutton(self.frm_view,
+                                               command=self._filter_tree,
+                                               text='changes only',
+                                               variable=self.__rbt_view,
+                                               value='edited',
+                                               style='big.TRadiobutton')
+
+        self.rbt_view_not_default = ttk.Radiobutton(self.frm_view,
+                                                    command=self._filter_tree,
+                                                    text='differs from default',
+                                                    variable=self.__rbt_view,
+                                                    value='not_default',
+                                                    state='normal' if self.default_config_dict is not None else 'disabled',
+                                                    style='big.TRadiobutton')
 
         self.lab_key = ttk.Label(self.frm_edit,
                                  text='Key: ',
@@ -205,6 +311,8 @@ class ConfigEditor(tk.Tk):
                                         state='disabled',
                                         # style='big.TCombobox',
                                         font=self.ccb_font)
+        self.cbb_boolean.bind('<<ComboboxSelected>>', self._update_btn_bulk_change_value)
+        self.entry_value_str_var.trace_add('write', self._update_btn_bulk_change_value)
 
         self.lab_warning = ttk.Label(self.frm_edit,
                                      text='',
@@ -238,6 +346,71 @@ class ConfigEditor(tk.Tk):
                                          style='big.TButton')
         self.btn_delete_key['width'] = 120
 
+        self.frm_bulk = ttk.Frame(self.frm_edit)
+
+        self.lab_bulk = ttk.Label(self.frm_bulk,
+                                  text='Bulk Edit: ',
+                                  anchor=tk.W,
+                                  style='bigbold.TLabel')
+
+        self.frm_find = ttk.Frame(self.frm_bulk)
+
+        self.lab_find = ttk.Label(self.frm_find,
+                                  text='Find ',
+                                  width=8,
+                                  anchor=tk.W,
+                                  style='big.TLabel')
+
+        self.entry_find = ttk.Entry(self.frm_find,
+                                    textvariable=self.entry_find_str_var,
+                                    font=self.entry_font)
+
+        self.cbt_find_regex = ttk.Checkbutton(self.frm_find,
+                                              text='regex',
+                                              variable=self.__cbt_find_regex)
+
+        self.btn_select_matches = ttk.Button(self.frm_find,
+                                             command=self._action_btn_select_matches,
+                                             text='Select Matches',
+                                             takefocus=False,
+                                             style='big.TButton')
+
+        self.frm_replace = ttk.Frame(self.frm_bulk)
+
+        self.lab_replace = ttk.Label(self.frm_replace,
+                                     text='Replace ',
+                                     width=8,
+                                     anchor=tk.W,
+                                     style='big.TLabel')
+
+        self.entry_replace = ttk.Entry(self.frm_replace,
+                                       textvariable=self.entry_replace_str_var,
+                                       font=self.entry_font)
+
+        self.btn_replace = ttk.Button(self.frm_replace,
+                                      command=self._action_btn_replace,
+                                      text='Replace in Selected',
+                                      takefocus=False,
+                                      style='big.TButton')
+
+        self.frm_btn_bulk = ttk.Frame(self.frm_bulk)
+
+        self.btn_bulk_change_value = ttk.Button(self.frm_btn_bulk,
+                                                command=self._action_btn_bulk_change_value,
+                                                text='Change Value of Selected',
+                                                takefocus=False,
+                                                state='disabled',
+                                                style='big.TButton')
+        self.btn_bulk_change_value['width'] = 25
+
+        self.btn_undo_bulk_edit = ttk.Button(self.frm_btn_bulk,
+                                             command=self._action_btn_undo_bulk_edit,
+                                             text='Undo Bulk Edit',
+                                             takefocus=False,
+                                             state='disabled',
+                                             style='big.TButton')
+        self.btn_undo_bulk_edit['width'] = 25
+
         self.frm_dir_status = ttk.Frame(self.frm_edit)
 
         self.lab_topic_dir = ttk.Label(self.frm_dir_status,
@@ -286,6 +459,18 @@ class ConfigEditor(tk.Tk):
                                    style='big.TButton')
         self.btn_save['width'] = 1000
 
+        self.frm_search.pack(side=tk.TOP, fill=tk.X, pady=(0, 20))
+        self.lab_search.pack(side=tk.TOP, anchor=tk.W)
+        self.entry_search.pack(side=tk.TOP, fill=tk.X)
+        self.rbt_search_substring.pack(side=tk.LEFT, anchor=tk.W, padx=7)
+        self.rbt_search_prefix.pack(side=tk.LEFT, anchor=tk.W, padx=7)
+
+        self.frm_view.pack(side=tk.TOP, fill=tk.X, pady=(0, 20))
+        self.lab_view.pack(side=tk.TOP, anchor=tk.W)
+        self.rbt_view_all.pack(side=tk.LEFT, anchor=tk.W, padx=7)
+        self.rbt_view_edited.pack(side=tk.LEFT, anchor=tk.W, padx=7)
+        self.rbt_view_not_default.pack(side=tk.LEFT, anchor=tk.W, padx=7)
+
         self.lab_key.pack(side=tk.TOP, fill=tk.X)
         self.entry_select_status.pack(side=tk.TOP, fill=tk.X)
 
@@ -306,6 +491,21 @@ class ConfigEditor(tk.Tk):
         self.btn_change_value.pack(side=tk.LEFT)
         self.btn_clear.pack(side=tk.RIGHT)
 
+        self.frm_bulk.pack(side=tk.TOP, fill=tk.X, pady=(10, 0))
+        self.lab_bulk.pack(side=tk.TOP, anchor=tk.W)
+        self.frm_find.pack(side=tk.TOP, fill=tk.X)
+        self.lab_find.pack(side=tk.LEFT)
+        self.btn_select_matches.pack(side=tk.RIGHT)
+        self.cbt_find_regex.pack(side=tk.RIGHT, padx=7)
+        self.entry_find.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.frm_replace.pack(side=tk.TOP, fill=tk.X, pady=(5, 0))
+        self.lab_replace.pack(side=tk.LEFT)
+        self.btn_replace.pack(side=tk.RIGHT)
+        self.entry_replace.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.frm_btn_bulk.pack(side=tk.TOP, fill=tk.X, pady=10)
+        self.btn_bulk_change_value.pack(side=tk.LEFT)
+        self.btn_undo_bulk_edit.pack(side=tk.RIGHT)
+
         self.btn_save.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.frm_btn_undo_reset.pack(side=tk.BOTTOM, fill=tk.X, pady=10)
@@ -324,45 +524,667 @@ class ConfigEditor(tk.Tk):
 
     def _add_brunch(self,
                     root_name: str,
-                    config_list: list):
-
-        self.tv.insert(parent='',
-                       index='end',
-                       iid=root_name,
-                       text=root_name,
-                       values=self.values_for_key,
-                       open=False)
-
-        branchs = list()
-        created_iids = [root_name]
+                    config_list: list,
+                    paged_lists: Optional[dict] = None):
+        '''Insert the rows of melted records under root_name.
+        Elements of the lists in paged_lists, {list iid: length}, are grouped into pages of list_page_size
+        elements whose rows are only inserted once the page is expanded.
+        '''
+        if root_name not in self.index:
+            self.tv.insert(parent='',
+                           index='end',
+                           iid=root_name,
+                           text=root_name,
+                           values=self.values_for_key,
+                           open=False)
+
+        if paged_lists is None:
+            paged_lists = dict()
+        page_children = dict()
+
+        branchs = set()
+        created_iids = {root_name}
         for record in config_list:
             branch = [root_name] + record[0] + [record[1]]
-            if branch not in branchs:
-                branchs.append(branch)
+            if tuple(branch) not in branchs:
+                branchs.add(tuple(branch))
+                page_rows = None
                 for i in range(len(branch)):
                     parent = '__'.join(branch[:i])
                     iid = '__'.join(branch[: i + 1])
                     text = branch[: i + 1][-1]
-                    if iid not in created_iids:
-                        created_iids.append(iid)
+                    if parent in paged_lists:
+                        # An element of a paged list, its row and all rows below go to its page
+                        element_index = int(text[len(self.list_key_prefix):])
+                        page_iid = self._get_page_iid(parent, element_index)
+                        if page_iid not in created_iids:
+                            created_iids.add(page_iid)
+                            self._insert_page_row(parent,
+                                                  page_iid,
+                                                  element_index // self.list_page_size * self.list_page_size,
+                                                  self._get_page_text(element_index, paged_lists[parent]),
+                                                  page_rows)
+                            page_children[page_iid] = list()
+                        if iid not in created_iids and iid not in self.index:
+                            page_children[page_iid].append(iid)
+                        parent = page_iid
+                        page_rows = self.__page_rows.get(page_iid, page_rows)
+                    if iid not in created_iids and iid not in self.index:
+                        created_iids.add(iid)
                         if i == (len(branch) - 1):
                             values = (record[2], type(record[2]))
                         else:
                             values = self.values_for_key
-                        self.tv.insert(parent=parent,
-                                       index='end',
-                                       iid=iid,
-                                       text=text,
-                                       values=values,
-                                       open=True)
+                        if page_rows is not None:
+                            page_rows.append((parent, iid, text, values, True))
+                        else:
+                            self.tv.insert(parent=parent,
+                                           index='end',
+                                           iid=iid,
+                                           text=text,
+                                           values=values,
+                                           open=True)
+
+        self.index.add_records(root_name=root_name,
+                               config_list=config_list)
+        for page_iid, children in page_children.items():
+            self.index.add_group(iid=page_iid,
+                                 parent=self.__pages[page_iid][0],
+                                 children=children)
+
+    def _get_paged_lists(self, iid, value):
+        '''Returns {list iid: length} of the lists in value longer than list_page_size.
+        '''
+        paged_lists = dict()
+        stack = [(iid, value)]
+        while stack:
+            iid, value = stack.pop()
+            if isinstance(value, list):
+                if len(value) > self.list_page_size:
+                    paged_lists[iid] = len(value)
+                items = enumerate(value)
+                key_prefix = f'{iid}__{self.list_key_prefix}'
+            elif isinstance(value, dict):
+                items = value.items()
+                key_prefix = f'{iid}__'
+            else:
+                continue
+            for key, item in items:
+                if isinstance(item, (dict, list)):
+                    stack.append((f'{key_prefix}{key}', item))
+        return paged_lists
+
+    def _get_page_iid(self, list_iid, index):
+        # Only the start, so the iid of the last page stays the same when the list length changes
+        start = index // self.list_page_size * self.list_page_size
+        return f'{list_iid}__[{start}..]'
+
+    def _get_page_text(self, index, length):
+        start = index // self.list_page_size * self.list_page_size
+        stop = min(start + self.list_page_size, length) - 1
+        return f'[{start}..{stop}]'
+
+    def _get_page(self, list_iid, index, length):
+        '''Returns the page iid of an element of a paged list, the page is inserted if none of its elements had rows.
+        '''
+        page_iid = self._get_page_iid(list_iid, index)
+        if page_iid in self.index:
+            return page_iid
+        start = index // self.list_page_size * self.list_page_size
+        pages = self.__paged_lists[list_iid]
+        position = sum(1 for other_page_iid in pages if self.__pages[other_page_iid][1] < start)
+        pages.insert(position, page_iid)
+        self.__pages[page_iid] = (list_iid, start)
+        self.tv.insert(parent=list_iid,
+                       index=position,
+                       iid=page_iid,
+                       text=self._get_page_text(index, length),
+                       values=self.values_for_page,
+                       open=True)
+        self.index.add_group(iid=page_iid, parent=list_iid, children=list(), index=position)
+        return page_iid
+
+    def _insert_page_row(self, list_iid, page_iid, start, text, page_rows=None):
+        '''Insert a collapsed page row with a placeholder child, so it can be expanded.
+        Inside a page which is not expanded yet, the rows are added to its page_rows instead.
+        '''
+        self.__pages[page_iid] = (list_iid, start)
+        self.__paged_lists.setdefault(list_iid, list()).append(page_iid)
+        self.__page_rows[page_iid] = list()
+        rows = [(list_iid, page_iid, text, self.values_for_page, False),
+                (page_iid, f'{page_iid}__...', '...', (), False)]
+        if page_rows is not None:
+            page_rows.extend(rows)
+            return
+        for parent, iid, text, values, is_open in rows:
+            self.tv.insert(parent=parent,
+                           index='end',
+                           iid=iid,
+                           text=text,
+                           values=values,
+                           open=is_open,
+                           tags=self._get_diff_tags(iid) if iid in self.index else ())
+
+    def _materialize_page(self, page_iid):
+        '''Insert the rows of a page which has not been expanded yet.
+        '''
+        rows = self.__page_rows.pop(page_iid, None)
+        if rows is None:
+            return
+        self.tv.delete(f'{page_iid}__...')
+        for parent, iid, text, values, is_open in rows:
+            self.tv.insert(parent=parent,
+                           index='end',
+                           iid=iid,
+                           text=text,
+                           values=values,
+                           open=is_open,
+                           tags=self._get_diff_tags(iid) if iid in self.index else ())
+        if self.__pending_selection:
+            selected = [iid for parent, iid, text, values, is_open in rows if iid in self.__pending_selection]
+            if selected:
+                self.__pending_selection.difference_update(selected)
+                self.__selection.update(selected)
+                self.tv.selection_add(selected)
+
+    def _materialize_page_of(self, iid):
+        # Expand every page above the item, outer pages first
+        if not self.__page_rows:
+            return
+        pending_pages = list()
+        while iid:
+            if iid in self.__page_rows:
+                pending_pages.append(iid)
+            iid = self.index.get_parent(iid)
+        for page_iid in reversed(pending_pages):
+            self._materialize_page(page_iid)
+
+    def _get_pending_page(self, iid):
+        '''Returns the page not expanded yet whose rows hold the row of iid, None if the row is in the tree.
+        '''
+        if not self.__page_rows:
+            return None
+        iid = self.index.get_parent(iid)
+        while iid:
+            if iid in self.__page_rows:
+                return iid
+            iid = self.index.get_parent(iid)
+        return None
+
+    def _is_in_pending_page(self, iid):
+        return self._get_pending_page(iid) is not None
+
+    def _update_rows(self, options_by_iid):
+        '''Change the text or values of rows, {iid: {'text': ..., 'values': ...}}.
+        Rows of pages not expanded yet are changed in their page rows, without expanding the pages.
+        '''
+        pending_options = dict()
+        for iid, options in options_by_iid.items():
+            page_iid = self._get_pending_page(iid)
+            if page_iid is None:
+                self.tv.item(iid, **options)
+            else:
+                pending_options.setdefault(page_iid, dict())[iid] = options
+        for page_iid, page_options in pending_options.items():
+            rows = list()
+            for parent, iid, text, values, is_open in self.__page_rows[page_iid]:
+                options = page_options.get(iid)
+                if options is not None:
+                    text = options.get('text', text)
+                    values = options.get('values', values)
+                rows.append((parent, iid, text, values, is_open))
+            self.__page_rows[page_iid] = rows
+
+    def _forget_deleted_pages(self):
+        for list_iid in list(self.__paged_lists):
+            pages = [page_iid for page_iid in self.__paged_lists[list_iid] if page_iid in self.index]
+            for page_iid in self.__paged_lists[list_iid]:
+                if page_iid not in self.index:
+                    self.__pages.pop(page_iid, None)
+                    self.__page_rows.pop(page_iid, None)
+            if pages:
+                self.__paged_lists[list_iid] = pages
+            else:
+                del self.__paged_lists[list_iid]
+
+    def _patch_list(self, list_path, start=0):
+        '''Re-create the rows of the list at list_path from the element at start on, e.g. after an element was deleted.
+        Pages before the page of start are kept, without melting their elements again.
+        '''
+        list_path = tuple(list_path)
+        list_iid = self._path_to_tv_key(list_path)
+        value = self._get_actual_value(list_path)
+        if list_iid in self.index:
+            self._materialize_page_of(list_iid)
+        if list_iid not in self.__paged_lists or len(value) <= self.list_page_size:
+            self._replace_subtree(list_path, value)
+            return
+
+        start = start // self.list_page_size * self.list_page_size
+        for page_iid in self.__paged_lists[list_iid]:
+            if self.__pages[page_iid][1] >= start:
+                self._delete_rows(page_iid)
+        self._forget_deleted_pages()
+
+        config_list = ConfigMelter().melt({f'{self.list_key_prefix}{i}': value[i] for i in range(start, len(value))})
+        paged_lists = {list_iid: len(value)}
+        for i in range(start, len(value)):
+            paged_lists.update(self._get_paged_lists(f'{list_iid}__{self.list_key_prefix}{i}', value[i]))
+        self._add_brunch(root_name=list_iid,
+                         config_list=config_list,
+                         paged_lists=paged_lists)
+
+    def _delete_list_element(self, list_path, index, deleted_value):
+        '''Update the rows of a paged list after its element at index was deleted.
+        The rows keep their iids, which are list positions, and show the following element instead,
+        so the elements are not melted again and the pages keep their expanded or collapsed state.
+        '''
+        list_path = tuple(list_path)
+        list_iid = self._path_to_tv_key(list_path)
+        value = self._get_actual_value(list_path)
+        values = dict()
+        for i in range(index, len(value)):
+            self._shift_rows(list_path + (f'{self.list_key_prefix}{i}',),
+                             deleted_value if i == index else value[i - 1],
+                             value[i],
+                             values)
+        self._update_rows({iid: {'values': (item, type(item))} for iid, item in values.items()})
+        self.index.update_values(values)
+
+        # The row of the last position is left over, an empty dictionary or list has none
+        last_path = list_path + (f'{self.list_key_prefix}{len(value)}',)
+        last_iid = self._path_to_tv_key(last_path)
+        if last_iid in self.index:
+            self._delete_rows(last_iid)
+        self._delete_empty_key_rows(last_path)
+        page_iid = self._get_page_iid(list_iid, len(value) - 1)
+        if page_iid in self.index:
+            self._update_rows({page_iid: {'text': self._get_page_text(len(value) - 1, len(value))}})
+        self._forget_deleted_pages()
+
+    def _shift_rows(self, path, shown_value, value, values):
+        # Rows showing shown_value are changed to show value, leaves with the same path only get the new value in values
+        if isinstance(shown_value, dict) and isinstance(value, dict) and list(shown_value) == list(value):
+            for key in value:
+                self._shift_rows(path + (key,), shown_value[key], value[key], values)
+        elif isinstance(shown_value, list) and isinstance(value, list) and len(shown_value) == len(value):
+            for i in range(len(value)):
+                self._shift_rows(path + (f'{self.list_key_prefix}{i}',), shown_value[i], value[i], values)
+        elif not isinstance(shown_value, (dict, list)) and not isinstance(value, (dict, list)):
+            if type(shown_value) is not type(value) or shown_value != value:
+                values[self._path_to_tv_key(path)] = value
+        else:
+            # Other keys or lengths, only this subtree is re-created
+            self._materialize_path(path)
+            self._replace_subtree(path, value)
 
     def _init_branch(self):
         cm = ConfigMelter()
         processed_config_dict = dict()
+        self.index.clear()
+        self.__paged_lists = dict()
+        self.__pages = dict()
+        self.__page_rows = dict()
         for file_name in self.edited_config_dict:
-            processed_config_dict[file_name] = cm.melt(self.edited_config_dict[file_name])
-            self._add_brunch(root_name=file_name,
-                             config_list=processed_config_dict[file_name])
+            with span('ConfigEditor._init_branch', file_name):
+                processed_config_dict[file_name] = cm.melt(self.edited_config_dict[file_name])
+                self._add_brunch(root_name=file_name,
+                                 config_list=processed_config_dict[file_name],
+                                 paged_lists=self._get_paged_lists(file_name, self.edited_config_dict[file_name]))
+        self._init_diff()
+        self._filter_tree()
+
+    def _filter_tree(self):
+        if self.__search_after_id is not None:
+            self.after_cancel(self.__search_after_id)
+            self.__search_after_id = None
+
+        view = self.__rbt_view.get()
+        if view == 'edited':
+            iids = self.__edited_iids
+        elif view == 'not_default':
+            iids = self.__not_default_iids
+        else:
+            iids = None
+
+        query = self.entry_search_str_var.get()
+        changed_children = self.index.filter(query,
+                                             mode=self.__rbt_search_mode.get(),
+                                             iids=iids,
+                                             max_matches=self.search_max_matches)
+        if query and self.index.is_search_truncated:
+            self.lab_warning.configure(text=f'More than {self.search_max_matches} items match, only some of them are shown.')
+        for parent in changed_children:
+            # Matches inside a page which has not been expanded need its rows
+            self._materialize_page_of(parent)
+        for parent, children in changed_children.items():
+            self.tv.set_children(parent, *children)
+
+    def _path_to_tv_key(self, path):
+        return '__'.join(str(key) for key in path)
+
+    def _insert_key_rows(self, path):
+        for i in range(1, len(path) + 1):
+            iid = self._path_to_tv_key(path[:i])
+            if iid in self.index:
+                continue
+            parent = self._get_row_parent(path[:i])
+            index = self._get_insert_position(path[:i])
+            self.tv.insert(parent=parent,
+                           index=index,
+                           iid=iid,
+                           text=path[i - 1],
+                           values=self.values_for_key,
+                           open=i > 1)
+            self.index.add_item(iid=iid, parent=parent, text=path[i - 1], index=index)
+
+    def _get_row_parent(self, path):
+        # The row of an element of a paged list is under its page
+        parent = self._path_to_tv_key(path[:-1])
+        if parent in self.__paged_lists:
+            parent = self._get_page(parent,
+                                    int(path[-1][len(self.list_key_prefix):]),
+                                    len(self._get_actual_value(path[:-1])))
+            # A row inserted into a page not expanded yet would come before its page rows
+            self._materialize_page(parent)
+        return parent
+
+    def _get_insert_position(self, path):
+        # Insert a new key right after the nearest key before it that already has a row
+        siblings = self.index.get_children(self._get_row_parent(path))
+        container = self._get_actual_value(path[:-1]) if len(path) > 1 else self.edited_config_dict
+        if isinstance(container, list):
+            index = int(path[-1][len(self.list_key_prefix):])
+            return sum(1 for sibling in siblings if int(sibling.rsplit(self.list_key_prefix, 1)[-1]) < index)
+        if not isinstance(container, dict):
+            return len(siblings)
+        keys = list(container)
+        for key in reversed(keys[:keys.index(path[-1])]):
+            iid = self._path_to_tv_key(path[:-1] + (key,))
+            if iid in siblings:
+                return siblings.index(iid) + 1
+        return 0
+
+    def _insert_subtree(self, path, value, index=None):
+        '''Insert the rows of value at path, the same rows _init_branch would create for it.
+        '''
+        path = tuple(path)
+        iid = self._path_to_tv_key(path)
+        if isinstance(value, (dict, list)):
+            paged_lists = self._get_paged_lists(iid, value)
+            if isinstance(value, list):
+                value = {f'{self.list_key_prefix}{i}': v for i, v in enumerate(value)}
+            config_list = ConfigMelter().melt(value)
+            if len(config_list) == 0 and len(path) > 1:
+                # Like _init_branch, only a file gets a row when it is empty, and so do its parents
+                return
+
+        self._insert_key_rows(path[:-1])
+        parent = self._get_row_parent(path)
+        if index is None:
+            index = self._get_insert_position(path)
+
+        if isinstance(value, (dict, list)):
+            self.tv.insert(parent=parent,
+                           index=index,
+                           iid=iid,
+                           text=path[-1],
+                           values=self.values_for_key,
+                           open=len(path) > 1)
+            self.index.add_item(iid=iid, parent=parent, text=path[-1], index=index)
+            self._add_brunch(root_name=iid,
+                             config_list=config_list,
+                             paged_lists=paged_lists)
+        else:
+            self.tv.insert(parent=parent,
+                           index=index,
+                           iid=iid,
+                           text=path[-1],
+                           values=(value, type(value)),
+                           open=True)
+            self.index.add_item(iid=iid, parent=parent, text=path[-1], value=value, index=index)
+
+    def _delete_rows(self, iid):
+        '''Delete the row of iid and every row below it, including the ones detached by the search filter
+        and the ones in pages not expanded yet.
+        '''
+        page_iid = self._get_pending_page(iid)
+        if page_iid is None:
+            self.tv.delete(*self.index.get_detached(iid), iid)
+        else:
+            prefix = f'{iid}__'
+            self.__page_rows[page_iid] = [row for row in self.__page_rows[page_iid]
+                                          if row[1] != iid and not row[1].startswith(prefix)]
+        self.index.remove(iid)
+
+    def _delete_subtree(self, path):
+        iid = self._path_to_tv_key(path)
+        if iid in self.index:
+            self._delete_rows(iid)
+            if self.__paged_lists:
+                self._forget_deleted_pages()
+
+    def _delete_empty_key_rows(self, path):
+        # _init_branch does not create rows for empty dictionaries and lists, only for empty files
+        for i in range(len(path) - 1, 1, -1):
+            iid = self._path_to_tv_key(path[:i])
+            if iid not in self.index:
+                break
+            for page_iid in self.__paged_lists.get(iid, ()):
+                # Nor a page without rows
+                if page_iid in self.index and not self.index.get_children(page_iid):
+                    self._delete_rows(page_iid)
+            if self.index.get_children(iid):
+                self._forget_deleted_pages()
+                break
+            self._delete_subtree(path[:i])
+
+    def _replace_subtree(self, path, value):
+        iid = self._path_to_tv_key(path)
+        if iid not in self.index:
+            self._insert_subtree(path, value)
+        elif not isinstance(value, (dict, list)) and list(self.tv.item(iid, 'values')) != self.values_for_key:
+            # A value replacing a value only needs the row updated in place
+            self.tv.item(iid, values=(value, type(value)))
+            self.index.update_value(iid, value)
+        else:
+            position = self.index.get_children(self.index.get_parent(iid)).index(iid)
+            self._delete_subtree(path)
+            self._insert_subtree(path, value, index=position)
+            # An empty dictionary or list gets no row, its parents may be left without children
+            self._delete_empty_key_rows(path)
+
+    def _patch_branch(self, config_dict):
+        '''Replace edited_config_dict by config_dict and update only the rows that differ,
+        instead of deleting and re-creating the whole tree.
+        '''
+        diff = ConfigDiff(self.edited_config_dict,
+                          config_dict,
+                          list_key_prefix=self.list_key_prefix)
+        # The diff only compares values, dictionaries whose keys moved are reordered separately
+        reordered_paths = self._get_reordered_paths(self.edited_config_dict, config_dict)
+        self.edited_config_dict = config_dict
+        # Apply every Treeview change in a single idle callback
+        self.after_idle(self._apply_branch_patch, diff, reordered_paths)
+
+    def _get_reordered_paths(self, old_value, new_value):
+        '''Returns paths of the dictionaries in both values whose keys are not in the same order.
+        '''
+        reordered_paths = list()
+        stack = [((), old_value, new_value)]
+        while stack:
+            path, old, new = stack.pop()
+            if isinstance(old, dict) and isinstance(new, dict):
+                if list(old) != list(new):
+                    reordered_paths.append(path)
+                items = [(key, old[key], new[key]) for key in new if key in old]
+            elif isinstance(old, list) and isinstance(new, list):
+                items = [(f'{self.list_key_prefix}{i}', old[i], new[i]) for i in range(min(len(old), len(new)))]
+            else:
+                continue
+            for key, old_item, new_item in items:
+                if isinstance(old_item, (dict, list)) and isinstance(new_item, (dict, list)):
+                    stack.append((path + (key,), old_item, new_item))
+        return reordered_paths
+
+    def _sort_rows(self, path):
+        '''Move the rows of the dictionary at path into the order of its keys.
+        '''
+        iid = self._path_to_tv_key(path)
+        if path and iid not in self.index:
+            return
+        self._materialize_path(path)
+        container = self._get_actual_value(path) if path else self.edited_config_dict
+        children = self.index.get_children(iid)
+        rows = set(children)
+        ordered = [child for child in (self._path_to_tv_key(path + (key,)) for key in container) if child in rows]
+        for child, position in self._get_moves(children, ordered):
+            self.index.move(child, position)
+        for child, position in self._get_moves(list(self.tv.get_children(iid)), self.index.get_shown_children(iid)):
+            self.tv.move(child, iid, position)
+
+    @staticmethod
+    def _get_moves(items, ordered):
+        # Moves which turn items into ordered, only the items out of place are moved
+        items = list(items)
+        for position, item in enumerate(ordered):
+            if items[position] != item:
+                items.remove(item)
+                items.insert(position, item)
+                yield item, position
+
+    def _get_list_patches(self, diff):
+        '''Returns {list path: first element to re-create} of the lists which are or become paged
+        and whose length changes, their rows are re-created by _patch_list instead of element by element.
+        '''
+        list_patches = dict()
+        for path in diff.removed | diff.added:
+            if len(path) < 2 or not str(path[-1]).startswith(self.list_key_prefix):
+                continue
+            list_path = path[:-1]
+            length = len(diff.get_value(self.edited_config_dict, list_path))
+            is_paged = self._path_to_tv_key(list_path) in self.__paged_lists
+            if is_paged and length > self.list_page_size:
+                start = int(path[-1][len(self.list_key_prefix):]) // self.list_page_size * self.list_page_size
+            elif is_paged or length > self.list_page_size:
+                # The list becomes paged or stops being paged
+                start = 0
+            else:
+                continue
+            list_patches[list_path] = min(list_patches.get(list_path, start), start)
+        return list_patches
+
+    def _is_list_patched(self, path, list_patches):
+        for list_path, start in list_patches.items():
+            if len(path) > len(list_path) and path[:len(list_path)] == list_path:
+                if int(path[len(list_path)][len(self.list_key_prefix):]) >= start:
+                    return True
+        return False
+
+    def _materialize_path(self, path):
+        for i in range(len(path), 0, -1):
+            iid = self._path_to_tv_key(path[:i])
+            if iid in self.index:
+                self._materialize_page_of(iid)
+                return
+
+    def _apply_branch_patch(self, diff, reordered_paths=()):
+        list_patches = self._get_list_patches(diff)
+        for path in diff.removed:
+            if self._is_list_patched(path, list_patches):
+                continue
+            self._materialize_path(path)
+            self._delete_subtree(path)
+            self._delete_empty_key_rows(path)
+        for path in diff.changed:
+            if self._is_list_patched(path, list_patches):
+                continue
+            self._materialize_path(path)
+            self._replace_subtree(path, diff.get_value(self.edited_config_dict, path))
+        for path in diff.added:
+            if self._is_list_patched(path, list_patches):
+                continue
+            self._materialize_path(path)
+            self._insert_subtree(path, diff.get_value(self.edited_config_dict, path))
+        for list_path, start in list_patches.items():
+            self._patch_list(list_path, start)
+        for path in reordered_paths:
+            self._sort_rows(path)
+        self._init_diff()
+        self._filter_tree()
+
+    def _init_diff(self):
+        previous_paths = set()
+        for diff in (self.diff_loaded, self.diff_default):
+            if diff is not None:
+                previous_paths |= diff.paths()
+
+        self.diff_loaded = ConfigDiff(self.config_dict,
+                                      self.edited_config_dict,
+                                      list_key_prefix=self.list_key_prefix)
+        self.__edited_iids = {self._path_to_tv_key(path) for path in self.diff_loaded.paths()}
+        # Rows that were different before may not be anymore
+        affected_paths = previous_paths | self.diff_loaded.paths()
+
+        if self.default_config_dict is not None:
+            self.diff_default = ConfigDiff(self.default_config_dict,
+                                           self.edited_config_dict,
+                                           list_key_prefix=self.list_key_prefix)
+            self.__not_default_iids = {self._path_to_tv_key(path) for path in self.diff_default.paths()}
+            affected_paths = affected_paths | self.diff_default.paths()
+
+        self._tag_diff_rows(affected_paths)
+
+    def _update_diff(self, *keys_list, elements_shifted=True):
+        '''Re-compare only the edited subtrees and re-tag their rows.
+        If elements_shifted is False, the edits only replaced values and a list element is compared alone.
+        '''
+        affected_paths = set()
+        for keys in keys_list:
+            if elements_shifted and len(keys) > 1 and str(keys[-1]).startswith(self.list_key_prefix):
+                # Deleting a list element shifts the following elements, compare the whole list
+                keys = keys[:-1]
+
+            affected_paths |= self.diff_loaded.update(self.config_dict,
+                                                      self.edited_config_dict,
+                                                      path=keys)
+            if self.diff_default is not None:
+                affected_paths |= self.diff_default.update(self.default_config_dict,
+                                                           self.edited_config_dict,
+                                                           path=keys)
+
+        self.__edited_iids = {self._path_to_tv_key(path) for path in self.diff_loaded.paths()}
+        if self.diff_default is not None:
+            self.__not_default_iids = {self._path_to_tv_key(path) for path in self.diff_default.paths()}
+
+        self._tag_diff_rows(affected_paths)
+        if self.__rbt_view.get() != 'all':
+            self._filter_tree()
+
+    def _get_diff_tags(self, iid):
+        tags = list()
+        for tag, diff_iids in (('edited', self.__edited_iids),
+                               ('not_default', self.__not_default_iids)):
+            item = iid
+            while item:
+                if item in diff_iids:
+                    tags.append(tag)
+                    break
+                item = self.index.get_parent(item)
+        return tags
+
+    def _tag_diff_rows(self, paths):
+        for path in paths:
+            iid = self._path_to_tv_key(path)
+            if iid not in self.index or self._is_in_pending_page(iid):
+                continue
+            stack = [iid]
+            while stack:
+                item = stack.pop()
+                self.tv.item(item, tags=self._get_diff_tags(item))
+                # Rows of a page are tagged when it is expanded
+                if item not in self.__page_rows:
+                    stack.extend(self.index.get_children(item))
 
     def _get_actual_value(self, keys):
         if len(keys) == 1:
@@ -433,6 +1255,8 @@ class ConfigEditor(tk.Tk):
         self.cbb_boolean.configure(state='disabled')
         self.btn_change_value.configure(state='disabled')
         self.btn_delete_key.configure(state='disabled')
+        self.__is_bulk_input = False
+        self.btn_bulk_change_value.configure(state='disabled')
         if reset_save_btn:
             self.btn_save.configure(state='disabled')
         if self.default_config_dict is None:
@@ -441,12 +1265,18 @@ class ConfigEditor(tk.Tk):
     def _action_tk_click_edit(self, *args, **kwargs):
         selected_key = self.tv.focus()
         record = self.tv.item(selected_key)
-        if len(record['values']) == 0:
+        if len(record['values']) == 0 or selected_key in self.__pages:
             self._clear_edit(reset_save_btn=False)
+            if len(self.tv.selection()) > 1:
+                self._start_bulk_input()
         elif record['values'] == self.values_for_key:
             self._clear_edit(reset_save_btn=False)
             self.btn_delete_key.configure(state='normal')
+            if len(self.tv.selection()) > 1:
+                self._start_bulk_input()
         else:
+            # Several selected rows are changed at once to the value shown for the focused one
+            self.__is_bulk_input = len(self.tv.selection()) > 1
             selected_keys = self._extract_tv_key(selected_key)
             selected_value = self._get_actual_value(selected_keys)
             self.entry_select_status_str_var.set(f'''{self.key_seperator.join(selected_keys)}''')
@@ -489,9 +1319,37 @@ class ConfigEditor(tk.Tk):
                 self.cbb_boolean.configure(state='disabled')
                 self.entry_value_str_var.set(str(selected_value))
                 self.cbb_boolean.set('')
+            self._update_btn_bulk_change_value()
+
+    def _start_bulk_input(self):
+        '''Enable the type and value widgets for the selected keys, without a type or value chosen.
+        '''
+        self.__is_bulk_input = True
+        self.rbt_dtype_str.configure(state='normal')
+        self.rbt_dtype_int.configure(state='normal')
+        self.rbt_dtype_float.configure(state='normal')
+        self.rbt_dtype_bool.configure(state='normal')
+        self.rbt_dtype_none.configure(state='normal')
+        self.__rbt_dtype.set('')
+        self._update_btn_bulk_change_value()
+
+    def _is_bulk_input_chosen(self):
+        input_type_str = self.__rbt_dtype.get()
+        if input_type_str == 'bool':
+            return self.cbb_boolean.current() >= 0
+        if input_type_str == 'none':
+            return True
+        if input_type_str in ('str', 'integer', 'float'):
+            return self.entry_value_str_var.get() != ''
+        return False
+
+    def _update_btn_bulk_change_value(self, *args, **kwargs):
+        is_ready = self.__is_bulk_input and self._is_bulk_input_chosen()
+        self.btn_bulk_change_value.configure(state='normal' if is_ready else 'disabled')
 
     def _make_sure_msg_box(message):
         def _make_sure(class_method):
+            @functools.wraps(class_method)
             def method_wrapper(self, *arg, **kwarg):
                 if messagebox.askokcancel(title='Warning', message=message):
                     return class_method(self, *arg, **kwarg)
@@ -511,9 +1369,38 @@ class ConfigEditor(tk.Tk):
         selected_keys = self._extract_tv_key(selected_key)
         # selected_value = self._get_actual_value(selected_keys)
 
+        edited_value, is_error = self._get_input_value()
+
+        if not is_error and self.schema is not None:
+            schema_error = self.schema.validate_value(selected_keys, edited_value)
+            if schema_error is not None:
+                self.lab_warning.configure(text=f'Value does not match the schema, {schema_error}.')
+                is_error = True
+
+        if not is_error:
+            # print('To be value:', edited_value, type(edited_value))
+            # print('TV before:', self.tv.set(selected_key))
+            # print('Actual before', selected_value, type(selected_value))
+            self.tv.set(selected_key, column='Value', value=str(edited_value))
+            self.tv.set(selected_key, column='Type', value=type(edited_value))
+            self._set_actual_value(keys=selected_keys, set_value=edited_value)
+            self.index.update_value(selected_key, edited_value)
+            self._update_diff(selected_keys)
+            self.btn_undo_all.configure(state='normal')
+            self.btn_save.configure(state='normal')
+            # print('TV after:', self.tv.set(selected_key))
+            # print('Actual after', self._get_actual_value(selected_keys), type(self._get_actual_value(selected_keys)))
+
+    def _get_input_value(self):
+        '''Returns the value typed in the value widgets as the selected type, and whether it is invalid.
+        '''
         input_type_str = self.__rbt_dtype.get()
         if input_type_str == 'bool':
             index = self.cbb_boolean.current()
+            if index < 0:
+                # Nothing chosen, the index must not pick the last value
+                self.lab_warning.configure(text='Value must be True or False.')
+                return None, True
             edited_value = self.list_value_for_cbb_boolean[index]
             is_error = False
         elif input_type_str == 'none':
@@ -540,41 +1427,208 @@ class ConfigEditor(tk.Tk):
             else:
                 self.lab_warning.configure(text='')
                 is_error = False
+        return edited_value, is_error
+
+    def _get_find_pattern(self):
+        '''Returns the compiled find pattern, a case insensitive plain text match unless regex is checked.
+        '''
+        find_str = self.entry_find_str_var.get()
+        if not self.__cbt_find_regex.get():
+            return re.compile(re.escape(find_str), re.IGNORECASE)
+        try:
+            return re.compile(find_str)
+        except re.error as e:
+            self.lab_warning.configure(text=f'Invalid regular expression, {e}.')
+            return None
+
+    def _iter_leaves(self):
+        '''Yields (keys, value) of every value which is not a dictionary or a list, in tree order.
+        '''
+        stack = [((key,), value) for key, value in reversed(list(self.edited_config_dict.items()))]
+        while stack:
+            keys, value = stack.pop()
+            if isinstance(value, dict):
+                stack.extend((keys + (key,), item) for key, item in reversed(list(value.items())))
+            elif isinstance(value, list):
+                stack.extend((keys + (f'{self.list_key_prefix}{i}',), value[i]) for i in range(len(value) - 1, -1, -1))
+            else:
+                yield keys, value
+
+    def _get_selected_iids(self):
+        selection = self.tv.selection()
+        if self.__pending_selection and set(selection) == self.__selection:
+            return list(selection) + [iid for iid in self.__pending_selection if iid in self.index]
+        # The selection was changed in the tree since Select Matches
+        self.__pending_selection = set()
+        return list(selection)
+
+    def _get_selected_leaves(self):
+        '''Returns [(keys, value)] of the selected rows which hold a value,
+        including the ones selected by Select Matches in pages not expanded yet.
+        '''
+        leaves = list()
+        for iid in self._get_selected_iids():
+            if iid not in self.index or iid in self.__pages:
+                continue
+            keys = self._extract_tv_key(iid)
+            value = self._get_actual_value(keys)
+            if not isinstance(value, (dict, list)):
+                leaves.append((keys, value))
+        return leaves
+
+    def _bulk_edit(self, changes, record_undo=True):
+        '''Set every (keys, value) of changes as one operation.
+        The dictionaries are updated at once, the rows and differences in a single idle callback.
+        '''
+        if not changes:
+            # Nothing to undo or save
+            return
+        previous_values = list()
+        for keys, value in changes:
+            # The value set is kept too, undo must not revert a key changed again after the bulk edit
+            previous_values.append((keys, self._get_actual_value(keys), value))
+            self._set_actual_value(keys=keys, set_value=value)
+        if record_undo:
+            self.__bulk_edits.append(previous_values)
+            self.btn_undo_bulk_edit.configure(state='normal')
+        self.after_idle(self._apply_bulk_edit, changes)
+        self.btn_undo_all.configure(state='normal')
+        self.btn_save.configure(state='normal')
 
-        if not is_error:
-            # print('To be value:', edited_value, type(edited_value))
-            # print('TV before:', self.tv.set(selected_key))
-            # print('Actual before', selected_value, type(selected_value))
-            self.tv.set(selected_key, column='Value', value=str(edited_value))
-            self.tv.set(selected_key, column='Type', value=type(edited_value))
-            self._set_actual_value(keys=selected_keys, set_value=edited_value)
-            self.btn_undo_all.configure(state='normal')
-            self.btn_save.configure(state='normal')
-            # print('TV after:', self.tv.set(selected_key))
-            # print('Actual after', self._get_actual_value(selected_keys), type(self._get_actual_value(selected_keys)))
+    def _apply_bulk_edit(self, changes):
+        values = {self._path_to_tv_key(keys): value for keys, value in changes}
+        values = {iid: value for iid, value in values.items() if iid in self.index}
+        # Rows in pages not expanded yet are changed without expanding them
+        self._update_rows({iid: {'values': (value, type(value))} for iid, value in values.items()})
+        self.index.update_values(values)
+        self._update_diff(*(keys for keys, value in changes), elements_shifted=False)
+
+    def _clear_bulk_edits(self):
+        # Paths of earlier bulk edits are no longer valid once keys are deleted or the configuration is replaced,
+        # nor are the selected rows of pages not expanded yet
+        self.__bulk_edits.clear()
+        self.btn_undo_bulk_edit.configure(state='disabled')
+        self.__pending_selection = set()
+
+    def _action_btn_select_matches(self, *args, **kwargs):
+        pattern = self._get_find_pattern()
+        if pattern is None:
+            return
+        iids = list()
+        pending_iids = set()
+        for keys, value in self._iter_leaves():
+            if pattern.search(self.key_seperator.join(keys)) or pattern.search(str(value)):
+                iid = self._path_to_tv_key(keys)
+                if iid not in self.index:
+                    continue
+                # Matches in pages not expanded yet are selected once their page is expanded
+                if self._is_in_pending_page(iid):
+                    pending_iids.add(iid)
+                else:
+                    iids.append(iid)
+        self.tv.selection_set(iids)
+        self.__selection = set(iids)
+        self.__pending_selection = pending_iids
+        self._clear_edit(reset_save_btn=False)
+        if iids or pending_iids:
+            self._start_bulk_input()
+        self.entry_select_status_str_var.set(f'{len(iids) + len(pending_iids)} values selected')
+
+    @_make_sure_msg_box(message='Do you want to change the value of all selected keys?')
+    def _action_btn_bulk_change_value(self, *args, **kwargs):
+        if not self.__is_bulk_input or not self._is_bulk_input_chosen():
+            self.lab_warning.configure(text='Choose a type and a value for the selected keys.')
+            return
+        edited_value, is_error = self._get_input_value()
+        if is_error:
+            return
+        changes = list()
+        n_invalid = 0
+        for keys, value in self._get_selected_leaves():
+            if self.schema is not None and self.schema.validate_value(keys, edited_value) is not None:
+                n_invalid += 1
+            elif type(value) is not type(edited_value) or value != edited_value:
+                changes.append((keys, edited_value))
+        self._bulk_edit(changes)
+        self.entry_select_status_str_var.set(f'{len(changes)} values changed')
+        if n_invalid:
+            self.lab_warning.configure(text=f'{n_invalid} values do not match the schema and were skipped.')
+
+    @_make_sure_msg_box(message='Do you want to replace in all selected values?')
+    def _action_btn_replace(self, *args, **kwargs):
+        pattern = self._get_find_pattern()
+        if pattern is None:
+            return
+        replace_str = self.entry_replace_str_var.get()
+        if not self.__cbt_find_regex.get():
+            # Plain text replacement must not expand backslashes and group references
+            replace_str = replace_str.replace('\\', '\\\\')
+        changes = list()
+        n_invalid = 0
+        for keys, value in self._get_selected_leaves():
+            if not isinstance(value, str):
+                continue
+            try:
+                edited_value = pattern.sub(replace_str, value)
+            except re.error as e:
+                # e.g. a reference to a missing group, only found once the pattern matches
+                self.lab_warning.configure(text=f'Invalid replacement, {e}.')
+                return
+            if edited_value == value:
+                continue
+            if self.schema is not None and self.schema.validate_value(keys, edited_value) is not None:
+                n_invalid += 1
+            else:
+                changes.append((keys, edited_value))
+        self.lab_warning.configure(text='')
+        self._bulk_edit(changes)
+        self.entry_select_status_str_var.set(f'{len(changes)} values changed')
+        if n_invalid:
+            self.lab_warning.configure(text=f'{n_invalid} values do not match the schema and were skipped.')
+
+    @_make_sure_msg_box(message='Do you want to undo the last bulk edit?')
+    def _action_btn_undo_bulk_edit(self, *args, **kwargs):
+        if not self.__bulk_edits:
+            return
+        changes = list()
+        n_changed_after = 0
+        for keys, previous_value, value in reversed(self.__bulk_edits.pop()):
+            current_value = self._get_actual_value(keys)
+            if type(current_value) is type(value) and current_value == value:
+                changes.append((keys, previous_value))
+            else:
+                n_changed_after += 1
+        self._bulk_edit(changes, record_undo=False)
+        if not self.__bulk_edits:
+            self.btn_undo_bulk_edit.configure(state='disabled')
+        if n_changed_after:
+            self.lab_warning.configure(text=f'{n_changed_after} values were changed after the bulk edit and were kept.')
 
     @_make_sure_msg_box(message='Do you want to undo all changed?')
     def _action_btn_undo_all(self, *args, **kwargs):
-        self.edited_config_dict = copy.deepcopy(self.config_dict)
+        self._clear_bulk_edits()
+        self._patch_branch(copy.deepcopy(self.config_dict))
         self._clear_edit()
-        self.tv.delete(*self.tv.get_children())
-        self._init_branch()
         self.btn_undo_all.configure(state='disabled')
 
     @_make_sure_msg_box(message='Do you want to reset to default config?')
     def _action_btn_reset(self, *args, **kwargs):
-        self.edited_config_dict = copy.deepcopy(self.default_config_dict)
+        self._clear_bulk_edits()
+        self._patch_branch(copy.deepcopy(self.default_config_dict))
         self._clear_edit()
-        self.tv.delete(*self.tv.get_children())
-        self._init_branch()
         self.btn_undo_all.configure(state='normal')
         self.btn_save.configure(state='normal')
 
     @_make_sure_msg_box(message='Do you want to save config to config files?')
     def _action_btn_save(self, *args, **kwargs):
         for file_name in self.edited_config_dict:
-            with open(f'{self._output_config_dir}{file_name}.yaml', 'w') as f:
-                yaml.dump(self.edited_config_dict[file_name], f, sort_keys=False)
+            with span('ConfigEditor._action_btn_save', file_name):
+                file_path = os.path.join(self._output_config_dir,
+                                         self._config_file_names_by_key.get(file_name, f'{file_name}.yaml'))
+                os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+                # Saved in the format of the loaded file, new files as YAML
+                with open(file_path, 'wb') as f:
+                    f.write(get_format(file_path).dumps(self.edited_config_dict[file_name]))
         self.btn_undo_all.configure(state='disabled')
         self.btn_save.configure(state='disabled')
 
@@ -582,32 +1636,66 @@ class ConfigEditor(tk.Tk):
     def _action_btn_delete(self, *args, **kwargs):
         selected_key = self.tv.focus()
         selected_keys = self._extract_tv_key(selected_key)
-        self.tv.delete(selected_key)
-        self._del_actual_value(keys=selected_keys)
+        is_list_element = len(selected_keys) > 1 and str(selected_keys[-1]).startswith(self.list_key_prefix)
+        if (is_list_element and self._path_to_tv_key(selected_keys[:-1]) in self.__paged_lists
+                and len(self._get_actual_value(selected_keys[:-1])) > self.list_page_size + 1):
+            # The list stays paged, the rows of the following elements are shifted in place
+            deleted_value = self._get_actual_value(selected_keys)
+            self._del_actual_value(keys=selected_keys)
+            self._clear_bulk_edits()
+            self._delete_list_element(selected_keys[:-1], int(selected_keys[-1][len(self.list_key_prefix):]), deleted_value)
+        else:
+            self._delete_rows(selected_key)
+            self._del_actual_value(keys=selected_keys)
+            self._clear_bulk_edits()
+            if self.__paged_lists:
+                self._forget_deleted_pages()
+            if is_list_element:
+                # The following list elements shift down by one, re-create the rows of the list from the deleted one
+                self._patch_list(selected_keys[:-1], start=int(selected_keys[-1][len(self.list_key_prefix):]))
+        self._update_diff(selected_keys)
 
         selected_key = self.tv.focus()
         record = self.tv.item(selected_key)
         if len(record['values']) == 0:
             self.btn_delete_key.configure(state='disabled')
 
+    def _action_tk_open_page(self, *args, **kwargs):
+        selected_key = self.tv.focus()
+        if selected_key in self.__page_rows:
+            self._materialize_page(selected_key)
+
+    def _action_entry_search(self, *args, **kwargs):
+        # Wait until typing pauses before filtering the tree
+        if self.__search_after_id is not None:
+            self.after_cancel(self.__search_after_id)
+        self.__search_after_id = self.after(self.search_delay_ms, self._filter_tree)
+
     def _action_rbt_dtype_str_int_float(self):
         self.entry_value.configure(state='normal')
         self.cbb_boolean.configure(state='disabled')
+        self._update_btn_bulk_change_value()
 
     def _action_rbt_dtype_bool(self):
         self.entry_value.configure(state='disabled')
         self.cbb_boolean.configure(state='readonly')
-        selected_key = self.tv.focus()
-        selected_keys = self._extract_tv_key(selected_key)
-        selected_value = self._get_actual_value(selected_keys)
-        if isinstance(selected_value, bool):
-            self.cbb_boolean.set(str(selected_value))
+        if self.__is_bulk_input:
+            # The value for the selected keys must be chosen
+            self.cbb_boolean.set('')
         else:
-            self.cbb_boolean.set(str(True))
+            selected_key = self.tv.focus()
+            selected_keys = self._extract_tv_key(selected_key)
+            selected_value = self._get_actual_value(selected_keys)
+            if isinstance(selected_value, bool):
+                self.cbb_boolean.set(str(selected_value))
+            else:
+                self.cbb_boolean.set(str(True))
+        self._update_btn_bulk_change_value()
 
     def _action_rbt_dtype_none(self):
         self.entry_value.configure(state='disabled')
         self.cbb_boolean.configure(state='disabled')
+        self._update_btn_bulk_change_value()
 
     def run(self):
         self.mainloop()
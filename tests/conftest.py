@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules are imported from the repository root, e.g. util.config_loader, as with python -m
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
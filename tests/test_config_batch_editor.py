@@ -0,0 +1,81 @@
+import os
+
+import pytest
+import yaml
+
+from util.config_batch_editor import ConfigBatchEditor
+
+
+def _write(file_path, config_dict):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w') as f:
+        yaml.dump(config_dict, f, sort_keys=False)
+
+
+def _read(file_path):
+    with open(file_path) as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    _write(str(tmp_path / 'EXAMPLE_1.yaml'), {'company': 'a', 'tutorial': [{'yaml': {'born': 2001}}, {'json': {'born': 2000}}]})
+    _write(str(tmp_path / 'EXAMPLE_2.yaml'), {'company': 'b', 'published': True})
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_set_delete_append(config_dir, workers):
+    batch_editor = ConfigBatchEditor(config_dir, workers=workers)
+    results = batch_editor.apply([
+        ('EXAMPLE_1', 'tutorial/-LIST-: 0/yaml/born', 'set', 2002),
+        ('EXAMPLE_1', 'tutorial/-LIST-: 2', 'set', {'toml': {'born': 2013}}),
+        ('EXAMPLE_1', 'author/name', 'set', 'x'),
+        ('EXAMPLE_2.yaml', 'published', 'delete', None),
+    ])
+    assert results == {'EXAMPLE_1.yaml': (3, None), 'EXAMPLE_2.yaml': (1, None)}
+    assert _read(os.path.join(config_dir, 'EXAMPLE_1.yaml')) == {
+        'company': 'a',
+        'tutorial': [{'yaml': {'born': 2002}}, {'json': {'born': 2000}}, {'toml': {'born': 2013}}],
+        'author': {'name': 'x'}}
+    assert _read(os.path.join(config_dir, 'EXAMPLE_2.yaml')) == {'company': 'b'}
+
+
+def test_unchanged_file_is_not_written(config_dir):
+    file_path = os.path.join(config_dir, 'EXAMPLE_2.yaml')
+    os.utime(file_path, ns=(0, 0))
+    results = ConfigBatchEditor(config_dir, workers=1).apply([('EXAMPLE_2', 'published', 'set', True)])
+    assert results == {'EXAMPLE_2.yaml': (0, None)}
+    assert os.stat(file_path).st_mtime_ns == 0
+
+
+def test_failing_operation_leaves_file_unwritten(config_dir):
+    file_path = os.path.join(config_dir, 'EXAMPLE_1.yaml')
+    with open(file_path, 'rb') as f:
+        before = f.read()
+    results = ConfigBatchEditor(config_dir, workers=1).apply([
+        ('EXAMPLE_1', 'company', 'set', 'changed'),
+        ('EXAMPLE_1', 'tutorial/-LIST-: 5/yaml', 'delete', None),
+        ('EXAMPLE_2', 'company', 'set', 'c'),
+    ])
+    n_changed, error = results['EXAMPLE_1.yaml']
+    assert n_changed == 0 and error.startswith('IndexError')
+    assert results['EXAMPLE_2.yaml'] == (1, None)
+    with open(file_path, 'rb') as f:
+        assert f.read() == before
+    assert [name for name in os.listdir(config_dir) if name.endswith('.tmp')] == []
+
+
+def test_output_dir_and_dry_run(config_dir, tmp_path):
+    output_config_dir = str(tmp_path / 'output')
+    patches = [('EXAMPLE_2', 'company', 'set', 'c')]
+    assert ConfigBatchEditor(config_dir, output_config_dir=output_config_dir, workers=1).apply(patches, dry_run=True) == {'EXAMPLE_2.yaml': (1, None)}
+    assert not os.path.exists(output_config_dir)
+    ConfigBatchEditor(config_dir, output_config_dir=output_config_dir, workers=1).apply(patches)
+    assert _read(os.path.join(output_config_dir, 'EXAMPLE_2.yaml')) == {'company': 'c', 'published': True}
+    assert _read(os.path.join(config_dir, 'EXAMPLE_2.yaml')) == {'company': 'b', 'published': True}
+
+
+def test_unknown_operation(config_dir):
+    with pytest.raises(ValueError):
+        ConfigBatchEditor(config_dir).apply([('EXAMPLE_1', 'company', 'rename', 'x')])
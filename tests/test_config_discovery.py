@@ -0,0 +1,62 @@
+import os
+import time
+
+import pytest
+
+from util.config_discovery import ConfigDiscovery, clear_listing_cache
+
+
+def _write(file_path, text=''):
+    with open(file_path, 'w') as f:
+        f.write(text)
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    clear_listing_cache()
+    _write(os.path.join(tmp_path, 'A.yaml'))
+    _write(os.path.join(tmp_path, 'notes.txt'))
+    yield str(tmp_path)
+    clear_listing_cache()
+
+
+def test_file_added_to_memoized_directory(config_dir):
+    # A directory modified long ago, its listing is memoized
+    old_mtime_ns = time.time_ns() - 60_000_000_000
+    _set_mtime(config_dir, old_mtime_ns)
+    discovery = ConfigDiscovery()
+    assert discovery.discover(config_dir) == ['A.yaml']
+    assert set(discovery.stats) == {'A.yaml'}
+
+    _write(os.path.join(config_dir, 'B.yaml'))
+    assert discovery.discover(config_dir) == ['A.yaml', 'B.yaml']
+
+
+def test_file_added_in_the_same_mtime_tick(config_dir):
+    discovery = ConfigDiscovery()
+    mtime_ns = os.stat(config_dir).st_mtime_ns
+    assert discovery.discover(config_dir) == ['A.yaml']
+
+    # On a filesystem with coarse mtimes, the directory keeps its mtime
+    _write(os.path.join(config_dir, 'B.yaml'))
+    _set_mtime(config_dir, mtime_ns)
+    assert discovery.discover(config_dir) == ['A.yaml', 'B.yaml']
+
+
+def test_symbolic_link_loop(config_dir):
+    os.makedirs(os.path.join(config_dir, 'sub'))
+    _write(os.path.join(config_dir, 'sub', 'C.yaml'))
+    try:
+        os.symlink('..', os.path.join(config_dir, 'sub', 'parent'))
+    except (OSError, NotImplementedError):
+        pytest.skip('symbolic links are not supported')
+    assert ConfigDiscovery(recursive=True).discover(config_dir) == ['A.yaml', 'sub/C.yaml']
+
+
+def test_missing_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ConfigDiscovery().discover(os.path.join(tmp_path, 'missing'))
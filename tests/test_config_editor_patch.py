@@ -0,0 +1,245 @@
+import copy
+
+import pytest
+
+pytest.importorskip('tkinter')
+
+from config_editor.config_editor import ConfigEditor  # noqa: E402
+from util.config_index import ConfigIndex  # noqa: E402
+
+
+class FakeTreeview:
+    '''The part of ttk.Treeview used to build and patch the tree, without a display.
+    '''
+    def __init__(self):
+        self.rows = {'': {'parent': None, 'text': '', 'values': (), 'children': []}}
+        self.selected = []
+
+    def insert(self, parent, index, iid, text, values, open=False, tags=()):
+        assert iid not in self.rows, iid
+        self.rows[iid] = {'parent': parent, 'text': text, 'values': tuple(values), 'children': []}
+        children = self.rows[parent]['children']
+        children.insert(len(children) if index == 'end' else index, iid)
+
+    def delete(self, *iids):
+        for iid in iids:
+            if iid not in self.rows:
+                continue
+            self.delete(*self.rows[iid]['children'])
+            self._detach(iid)
+            del self.rows[iid]
+
+    def _detach(self, iid):
+        siblings = self.rows[self.rows[iid]['parent']]['children']
+        if iid in siblings:
+            siblings.remove(iid)
+
+    def move(self, iid, parent, index):
+        self._detach(iid)
+        self.rows[iid]['parent'] = parent
+        self.rows[parent]['children'].insert(index, iid)
+
+    def set_children(self, iid, *children):
+        for child in children:
+            self._detach(child)
+            self.rows[child]['parent'] = iid
+        self.rows[iid]['children'] = list(children)
+
+    def get_children(self, iid=''):
+        return tuple(self.rows[iid]['children'])
+
+    def item(self, iid, option=None, **kwargs):
+        if kwargs:
+            if 'values' in kwargs:
+                self.rows[iid]['values'] = tuple(kwargs['values'])
+            if 'text' in kwargs:
+                self.rows[iid]['text'] = kwargs['text']
+            return None
+        record = {'text': self.rows[iid]['text'], 'values': list(self.rows[iid]['values'])}
+        return record[option] if option else record
+
+    def selection(self):
+        return tuple(self.selected)
+
+    def selection_set(self, iids):
+        self.selected = list(iids)
+
+    def selection_add(self, iids):
+        self.selected.extend(iid for iid in iids if iid not in self.selected)
+
+    def exists(self, iid):
+        return iid in self.rows
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _Widget:
+    def configure(self, **kwargs):
+        pass
+
+
+def _get_pending_pages(editor):
+    return set(editor._ConfigEditor__page_rows)
+
+
+def _make_editor(config_dict):
+    # Only the state used by _init_branch, _patch_branch and _filter_tree, without creating the GUI
+    editor = object.__new__(ConfigEditor)
+    editor.key_seperator = '/'
+    editor.values_for_key = ['', 'key']
+    editor.values_for_page = ['', 'page']
+    editor.list_page_size = 2
+    editor.list_key_prefix = '-LIST-: '
+    editor.search_max_matches = 1000
+    editor.config_dict = copy.deepcopy(config_dict)
+    editor.default_config_dict = None
+    editor.edited_config_dict = copy.deepcopy(config_dict)
+    editor.index = ConfigIndex()
+    editor.diff_loaded = None
+    editor.diff_default = None
+    editor._ConfigEditor__search_after_id = None
+    editor._ConfigEditor__edited_iids = set()
+    editor._ConfigEditor__not_default_iids = set()
+    editor._ConfigEditor__pending_selection = set()
+    editor._ConfigEditor__selection = set()
+    editor._ConfigEditor__rbt_view = _Var('all')
+    editor._ConfigEditor__rbt_search_mode = _Var('substring')
+    editor.entry_search_str_var = _Var('')
+    editor.lab_warning = _Widget()
+    editor.btn_delete_key = _Widget()
+    editor.btn_undo_bulk_edit = _Widget()
+    editor._ConfigEditor__bulk_edits = list()
+    editor.tv = FakeTreeview()
+    editor.after_idle = lambda callback, *args: callback(*args)
+    editor.after_cancel = lambda after_id: None
+    editor._init_branch()
+    return editor
+
+
+def _expand_pages(editor):
+    for page_iid in list(editor._ConfigEditor__page_rows):
+        editor._materialize_page(page_iid)
+
+
+def _get_rows(tv, iid=''):
+    return [(child, tv.rows[child]['text'], tuple(str(value) for value in tv.rows[child]['values']), _get_rows(tv, child))
+            for child in tv.get_children(iid)]
+
+
+@pytest.mark.parametrize('config_dict, patched_config_dict', [
+    # Keys and files in another order
+    ({'A': {'x': 1, 'y': {'p': 1, 'q': 2}, 'z': 3}}, {'A': {'z': 3, 'y': {'q': 2, 'p': 1}, 'x': 1}}),
+    ({'A': {'x': 1}, 'B': {'y': 2}}, {'B': {'y': 2}, 'A': {'x': 1}}),
+    ({'A': {'x': 1, 'y': 2}}, {'A': {'w': 0, 'y': 2, 'x': 1}}),
+    # Empty dictionaries and lists have no row
+    ({'A': {'a': {'x': 1}}}, {'A': {'a': {'y': {}}}}),
+    ({'A': {'a': {'b': 1}}}, {'A': {'a': {'b': {}}}}),
+    ({'A': {'a': {}}}, {'A': {'a': {'z': {}}}}),
+    ({'A': {'a': {'b': {'c': 1}, 'd': 2}}}, {'A': {'a': {'b': {'c': []}}}}),
+    ({'A': {'e': {}}}, {'A': {'e': {'z': 1}}}),
+    # Paged lists
+    ({'A': {'l': [1, 2, 3]}}, {'A': {'l': [3, {'k': 1}]}}),
+    ({'A': {'l': [{'b': 1, 'a': 2}, 2, 3]}}, {'A': {'l': [{'a': 2, 'b': 1}, 2, 3, 4, 5]}}),
+])
+@pytest.mark.parametrize('query', ['', 'a'])
+def test_patch_branch_matches_init_branch(config_dict, patched_config_dict, query):
+    editor = _make_editor(config_dict)
+    editor.entry_search_str_var.set(query)
+    editor._filter_tree()
+    editor._patch_branch(copy.deepcopy(patched_config_dict))
+    editor.entry_search_str_var.set('')
+    editor._filter_tree()
+
+    expected = _make_editor(patched_config_dict)
+    # Pages are expanded to compare their rows, a patch may expand some of them
+    _expand_pages(editor)
+    _expand_pages(expected)
+    assert _get_rows(editor.tv) == _get_rows(expected.tv)
+    assert editor.index.get_children('') == expected.index.get_children('')
+
+
+@pytest.mark.parametrize('config_dict, index, expanded_indexes, keeps_pages', [
+    # With list_page_size 2, the last page [6..6] is left empty
+    ({'A': {'l': [0, 1, 2, 3, 4, 5, 6]}}, 0, [0, 4], True),
+    ({'A': {'l': [0, 1, 2, 3, 4, 5, 6, 7]}}, 3, [2], True),
+    ({'A': {'l': [0, 1, 2, 3, 4]}}, 4, [4], True),
+    ({'A': {'l': [{'a': i, 'b': [i, 1]} for i in range(6)]}}, 1, [0, 2], True),
+    # Elements of other shapes, empty ones have no row
+    ({'A': {'l': [1, {'a': 1}, [1, 2], {}, 'x', {'b': {'c': 1}}, None]}}, 1, [0], False),
+    ({'A': {'l': [0, 1, 2, {}]}}, 0, [0], False),
+    # Paged lists in elements
+    ({'A': {'l': [[1, 2, 3], [4, 5, 6], [7], 8]}}, 0, [0], False),
+    ({'A': {'l': [None, [1, 'a'], [1, [], {'b': 'a'}], ['a', 1.5, []]]}}, 1, [0], False),
+    # Every element left is empty, so is the list
+    ({'A': {'l': [2, {}, [], {}], 'z': 1}}, 0, [0], False),
+])
+def test_delete_list_element_matches_init_branch(config_dict, index, expanded_indexes, keeps_pages):
+    editor = _make_editor(config_dict)
+    for expanded_index in expanded_indexes:
+        editor._materialize_page_of(f'A__l__-LIST-: {expanded_index}')
+    iid = f'A__l__-LIST-: {index}'
+    editor.tv.focus = lambda: iid if iid in editor.tv.rows else ''
+    ConfigEditor._action_btn_delete.__wrapped__(editor)
+
+    patched_config_dict = copy.deepcopy(config_dict)
+    del patched_config_dict['A']['l'][index]
+    assert editor.edited_config_dict == patched_config_dict
+    expected = _make_editor(patched_config_dict)
+    if keeps_pages:
+        # Expanded pages stay expanded, the other ones are not expanded by the delete
+        for expanded_index in expanded_indexes:
+            if expanded_index < len(patched_config_dict['A']['l']):
+                expected._materialize_page_of(f'A__l__-LIST-: {expanded_index}')
+        assert _get_pending_pages(editor) == _get_pending_pages(expected)
+        assert _get_rows(editor.tv) == _get_rows(expected.tv)
+    _expand_pages(editor)
+    _expand_pages(expected)
+    assert _get_rows(editor.tv) == _get_rows(expected.tv)
+    for query in ('1', 'a', '-list-: 2'):
+        assert editor.index.search(query) == expected.index.search(query)
+
+
+def test_select_matches_in_pages_not_expanded():
+    editor = _make_editor({'A': {'l': [{'a': i} for i in range(6)], 'b': 7}})
+    editor.entry_find_str_var = _Var('1')
+    editor.entry_select_status_str_var = _Var('')
+    editor._ConfigEditor__cbt_find_regex = _Var(False)
+    editor._clear_edit = lambda reset_save_btn=True: None
+    editor._start_bulk_input = lambda: None
+    pending_pages = _get_pending_pages(editor)
+    ConfigEditor._action_btn_select_matches(editor)
+
+    # The match in a collapsed page is selected without expanding it
+    assert _get_pending_pages(editor) == pending_pages
+    assert editor.tv.selection() == ()
+    assert editor._get_selected_leaves() == [(['A', 'l', '-LIST-: 1', 'a'], 1)]
+    assert editor.entry_select_status_str_var.get() == '1 values selected'
+    editor._materialize_page_of('A__l__-LIST-: 1__a')
+    assert editor.tv.selection() == ('A__l__-LIST-: 1__a',)
+    assert editor._get_selected_leaves() == [(['A', 'l', '-LIST-: 1', 'a'], 1)]
+
+
+def test_undo_bulk_edit_keeps_values_changed_after():
+    editor = _make_editor({'A': {'x': 1, 'y': 1, 'l': [1, 1, 1]}})
+    editor.btn_undo_all = editor.btn_save = _Widget()
+    editor._bulk_edit([(['A', 'x'], 2), (['A', 'y'], 2), (['A', 'l', '-LIST-: 2'], 2)])
+    # A single Change Value after the bulk edit, and one which sets the same value with another type
+    editor._set_actual_value(keys=['A', 'y'], set_value=3)
+    editor._set_actual_value(keys=['A', 'l', '-LIST-: 2'], set_value=2.0)
+    ConfigEditor._action_btn_undo_bulk_edit.__wrapped__(editor)
+
+    assert editor.edited_config_dict == {'A': {'x': 1, 'y': 3, 'l': [1, 1, 2.0]}}
+    assert editor.tv.rows['A__x']['values'] == (1, int)
+    assert 'A__x' not in editor.index.search('2')
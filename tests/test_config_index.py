@@ -0,0 +1,29 @@
+import pytest
+
+from util.config_index import ConfigIndex
+from util.config_loader import ConfigMelter
+
+
+@pytest.fixture
+def index():
+    index = ConfigIndex()
+    # Every 'enabled' key and True value share one token
+    index.add_records('F', ConfigMelter().melt({f'record_{i}': {'enabled': True, 'name': f'n{i}'} for i in range(100)}))
+    return index
+
+
+@pytest.mark.parametrize('query, mode', [('enabled', 'substring'), ('true', 'prefix'), ('n', 'substring'), ('record_', 'prefix')])
+def test_search_stops_at_max_matches(index, query, mode):
+    matched = index.search(query, mode=mode)
+    assert len(matched) >= 100 and not index.is_search_truncated
+    assert index.search(query, mode=mode, max_matches=len(matched)) == matched
+    capped = index.search(query, mode=mode, max_matches=10)
+    assert len(capped) == 10 and capped <= matched
+    assert index.is_search_truncated
+
+
+def test_filter_shows_at_most_max_matches(index):
+    changed_children = index.filter('true', max_matches=10)
+    # The records of the 10 matched values, each showing only its matched value
+    assert len(changed_children['F']) == 10
+    assert all(children == [f'{parent}__enabled'] for parent, children in changed_children.items() if parent not in ('', 'F'))
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from util.config_loader import BaseConfigLoader, ConfigLoader
+
+
+def _write(config_dir, file_name, text):
+    with open(os.path.join(config_dir, file_name), 'w') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    for name in ('A', 'B', 'C'):
+        _write(str(tmp_path), f'{name}.yaml', f'INDEP_ENV:\n  {name.lower()}: 1\n')
+    return str(tmp_path)
+
+
+def _count_reads(monkeypatch, config_loader):
+    file_paths = list()
+    read_config = config_loader._read_config
+
+    def counting_read_config(file_path):
+        file_paths.append(os.path.basename(file_path))
+        return read_config(file_path)
+    monkeypatch.setattr(config_loader, '_read_config', counting_read_config)
+    return file_paths
+
+
+def test_load_files_is_lazy(monkeypatch, config_dir):
+    config_loader = ConfigLoader(config_dir)
+    file_paths = _count_reads(monkeypatch, config_loader)
+    config_files = config_loader.load_files()
+    assert list(config_files) == ['A', 'B', 'C'] and len(config_files) == 3
+    assert file_paths == []
+    assert config_files['B'] == {'b': 1}
+    assert config_files['B'] is config_files['B']
+    assert file_paths == ['B.yaml']
+    assert 'C' in config_files and not config_files.is_loaded('C')
+    with pytest.raises(KeyError):
+        config_files['D']
+
+
+def test_load_files_evicts_least_recently_used(monkeypatch, config_dir):
+    config_loader = BaseConfigLoader(config_dir)
+    file_paths = _count_reads(monkeypatch, config_loader)
+    config_files = config_loader.load_files(max_cached=2)
+    config_files['A']
+    config_files['B']
+    # A becomes the most recently used, B is evicted by C
+    config_files['A']
+    config_files['C']
+    assert [key for key in config_files if config_files.is_loaded(key)] == ['A', 'C']
+    assert file_paths == ['A.yaml', 'B.yaml', 'C.yaml']
+    assert config_files['B'] == {'INDEP_ENV': {'b': 1}}
+    assert file_paths == ['A.yaml', 'B.yaml', 'C.yaml', 'B.yaml']
+    assert [key for key in config_files if config_files.is_loaded(key)] == ['B', 'C']
+
+    config_files.clear_cache()
+    assert not any(config_files.is_loaded(key) for key in config_files)
+
+
+def test_overlay_does_not_modify_source():
+    source = {'a': {'b': 1, 'c': {'d': 1}}, 'e': [1]}
+    result = ConfigLoader.overlay(source, {'a': {'b': 2}, 'e': [2], 'f': {}})
+    assert result == {'a': {'b': 2, 'c': {'d': 1}}, 'e': [2], 'f': {}}
+    assert source == {'a': {'b': 1, 'c': {'d': 1}}, 'e': [1]}
+    # Dictionaries off the overridden paths are shared
+    assert result['a']['c'] is source['a']['c']
+
+
+def test_load_all_envs_equals_load(tmp_path):
+    config_dir = str(tmp_path)
+    _write(config_dir, 'A.yaml', 'INDEP_ENV:\n  db:\n    host: a\n    port: 1\n  items: [1]\n'
+                                 'DEP_ENV:\n  DEV:\n    db:\n      host: dev\n  PROD:\n    db:\n      port: 2\n    items: [2]\n')
+    _write(config_dir, 'B.yaml', 'INDEP_ENV:\n  db:\n    user: b\nDEP_ENV:\n  NON_PROD:\n    db:\n      user: np\n')
+    _write(config_dir, 'C.yaml', 'INDEP_ENV:\n  name: c\n')
+
+    all_env_config_dicts = ConfigLoader(config_dir).load_all_envs()
+    assert list(all_env_config_dicts) == ['DEV', 'PROD', 'NON_PROD']
+    for env, config_dict in all_env_config_dicts.items():
+        assert config_dict == ConfigLoader(config_dir, running_env=env).load()
+    # The shared INDEP_ENV values are not modified by the overlays of the other environments
+    assert all_env_config_dicts['NON_PROD'] == {'db': {'host': 'a', 'port': 1, 'user': 'np'}, 'items': [1], 'name': 'c'}
+    assert ConfigLoader(config_dir).load_all_envs(envs=['PROD']) == {'PROD': ConfigLoader(config_dir, running_env='PROD').load()}
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from util.config_loader import ConfigLoader
+from util.config_schema import ConfigSchema, ConfigValidationError
+
+
+@pytest.mark.parametrize('types, value, is_valid', [
+    (int, 1, True),
+    (int, True, False),
+    (int, 1.0, False),
+    (bool, False, True),
+    (bool, 0, False),
+    ((float, int), 1, True),
+    ((float, int), True, False),
+    ((int, bool), True, True),
+    (str, '1', True),
+    (str, 1, False),
+    (None, [1], True),
+])
+def test_validate_value(types, value, is_valid):
+    schema = ConfigSchema({'a': types})
+    assert (schema.validate_value(['a'], value) is None) == is_valid
+
+
+def test_validate_paths():
+    schema = ConfigSchema.from_config({'a': {'b': [{'c': 1}, {'c': 2}], 'd': 1.5}, 'e': None})
+    assert schema.validate({'a': {'b': [{'c': 3}], 'd': 2}, 'e': 'x', 'f': 1}) == []
+    assert schema.validate({'a': {'b': [{'c': 3}, {'c': True}], 'd': 'x'}}) == [
+        'a/b/-LIST-: 1/c: expected int, got bool',
+        'a/d: expected float or int, got str']
+    assert ConfigSchema({'a': int}, allow_unknown=False).validate({'a': 1, 'b': 2}) == ['b: unknown key']
+
+
+def test_check_cache_key():
+    schema = ConfigSchema({'a': int})
+    schema.check({'a': 1}, cache_key='passed')
+    # The same content, the value is not validated again
+    schema.check({'a': 'x'}, cache_key='passed')
+    for i in range(2):
+        # A failed content is validated on every check
+        with pytest.raises(ConfigValidationError):
+            schema.check({'a': 'x'}, cache_key='failed')
+    with pytest.raises(ConfigValidationError):
+        schema.check({'a': 'x'})
+
+
+def test_loader_revalidates_changed_file(tmp_path):
+    file_path = str(tmp_path / 'EXAMPLE.yaml')
+    with open(file_path, 'w') as f:
+        f.write('INDEP_ENV:\n  port: 1\n')
+    schema = ConfigSchema({'port': int})
+    assert ConfigLoader(str(tmp_path), schema=schema).load() == {'port': 1}
+    with open(file_path, 'w') as f:
+        f.write('INDEP_ENV:\n  port: x\n')
+    with pytest.raises(ConfigValidationError):
+        ConfigLoader(str(tmp_path), schema=schema).load()
+
+
+def test_schema_of_another_shape(tmp_path):
+    with open(os.path.join(str(tmp_path), 'EXAMPLE.yaml'), 'w') as f:
+        f.write('INDEP_ENV:\n  port: 1\nDEP_ENV:\n  DEV:\n    host: a\n')
+    # Keyed by file name, nothing of the merged configuration would be validated
+    schema = ConfigSchema.from_dir(str(tmp_path))
+    with pytest.raises(ValueError):
+        ConfigLoader(str(tmp_path), schema=schema).load()
+    with pytest.raises(ValueError):
+        ConfigLoader(str(tmp_path), schema=schema).load_all_envs()
+
+    schema = ConfigSchema.from_dir(str(tmp_path), running_env='DEV')
+    assert ConfigLoader(str(tmp_path), schema=schema).load() == {'port': 1, 'host': 'a'}
+
+
+def test_from_dir_without_env_sections(tmp_path):
+    with open(os.path.join(str(tmp_path), 'EXAMPLE.yaml'), 'w') as f:
+        f.write('port: 1\n')
+    assert ConfigSchema.from_dir(str(tmp_path)).validate({'EXAMPLE': {'port': 'x'}}) == ['EXAMPLE/port: expected int, got str']
+    # Without INDEP_ENV and DEP_ENV the merged configuration is empty, there is nothing to infer
+    with pytest.raises(ValueError):
+        ConfigSchema.from_dir(str(tmp_path), running_env='DEV')
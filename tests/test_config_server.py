@@ -0,0 +1,150 @@
+import os
+import time
+import socket
+import http.client
+
+import pytest
+
+from util.config_server import ConfigServer, ConfigClient, make_delta, apply_delta
+
+
+def _write(config_dir, file_name, text):
+    file_path = os.path.join(config_dir, file_name)
+    with open(file_path, 'w') as f:
+        f.write(text)
+    # Files are compared by size and mtime, make sure a rewrite within the same tick is seen
+    mtime_ns = time.time_ns() + 10 ** 9 * len(text)
+    os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+
+def _connect(config_server):
+    if config_server.socket_path is not None:
+        connection = http.client.HTTPConnection('localhost', timeout=5)
+        connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.sock.connect(config_server.socket_path)
+        return connection
+    return http.client.HTTPConnection(config_server.host, config_server.port, timeout=5)
+
+
+def _get(config_server, headers=None):
+    connection = _connect(config_server)
+    try:
+        connection.request('GET', '/config', headers=headers or dict())
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    _write(str(tmp_path), 'EXAMPLE.yaml', 'INDEP_ENV:\n  name: a\n  items: [1, 2, 3]\nDEP_ENV:\n  DEV:\n    port: 1\n')
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('source, target', [
+    ({'a': 1}, {'a': 1}),
+    ({'a': 1, 'b': {'c': 2}}, {'a': 2, 'b': {'d': 3}}),
+    ({'a': [1, 2, 3]}, {'a': [1, 4]}),
+    ({'a': [1]}, {'a': [1, {'b': [2, 3]}, 5]}),
+    ({'a': [[1, 2], [3]]}, {'a': [[2], [3, 4, 5]]}),
+    ({'a': list(range(12))}, {'a': list(range(3, 15))}),
+    # A dictionary key which looks like a list element key
+    ({'a': {'-LIST-: x': 1}}, {'a': {'-LIST-: x': 2, '-LIST-: 0': 3}}),
+    ({'a': {'b': 1}}, {'a': [1, 2]}),
+])
+def test_delta_round_trip(source, target):
+    delta = make_delta(source, target)
+    assert apply_delta(source, delta) == target
+
+
+def test_apply_delta_does_not_modify_source():
+    source = {'a': {'b': [1, 2]}, 'c': {'d': 1}}
+    result = apply_delta(source, make_delta(source, {'a': {'b': [1]}, 'c': {'d': 1}}))
+    assert source == {'a': {'b': [1, 2]}, 'c': {'d': 1}}
+    # Values off the paths of the delta are shared
+    assert result['c'] is source['c']
+
+
+@pytest.mark.parametrize('use_socket', [False, True])
+def test_responses(config_dir, use_socket):
+    socket_path = os.path.join(config_dir, 'config.sock') if use_socket else None
+    with ConfigServer(config_dir, socket_path=socket_path, port=0, poll_interval=3600) as config_server:
+        status, headers, body = _get(config_server)
+        assert status == 200
+        assert config_server.json_format.loads(body) == {'name': 'a', 'items': [1, 2, 3], 'port': 1}
+        etag = headers['ETag']
+
+        status, headers, body = _get(config_server, {'If-None-Match': etag})
+        assert (status, headers['ETag'], body) == (304, etag, b'')
+
+        _write(config_dir, 'EXAMPLE.yaml', 'INDEP_ENV:\n  name: b\n  items: [1, 2]\nDEP_ENV:\n  DEV:\n    port: 1\n')
+        assert config_server.refresh()
+        status, headers, body = _get(config_server, {'If-None-Match': etag, 'A-IM': 'config-delta'})
+        assert status == 226
+        assert headers['Delta-Base'] == etag
+        delta = config_server.json_format.loads(body)
+        assert apply_delta({'name': 'a', 'items': [1, 2, 3], 'port': 1}, delta) == {'name': 'b', 'items': [1, 2], 'port': 1}
+
+        # Without A-IM the client gets the whole configuration
+        status, headers, body = _get(config_server, {'If-None-Match': etag})
+        assert status == 200
+
+        client = ConfigClient(socket_path=socket_path, port=config_server.port)
+        try:
+            assert client.get() == {'name': 'b', 'items': [1, 2], 'port': 1}
+            _write(config_dir, 'EXAMPLE.yaml', 'INDEP_ENV:\n  name: c\nDEP_ENV:\n  DEV:\n    port: 2\n')
+            config_server.refresh()
+            assert client.get() == {'name': 'c', 'port': 2}
+            assert client.version == 3
+        finally:
+            client.close()
+
+
+def test_malformed_file_keeps_last_snapshot(config_dir):
+    with ConfigServer(config_dir, port=0, poll_interval=0.01) as config_server:
+        status, headers, body = _get(config_server)
+        _write(config_dir, 'EXAMPLE.yaml', 'INDEP_ENV: [1\n')
+        deadline = time.monotonic() + 5
+        while config_server.status()['last_error'] is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert config_server.status()['last_error'] is not None
+        assert _get(config_server)[1:] == (headers, body)
+
+        _write(config_dir, 'EXAMPLE.yaml', 'INDEP_ENV:\n  name: fixed\n')
+        while config_server.snapshot.version == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert config_server.status()['last_error'] is None
+        assert config_server.snapshot.config == {'name': 'fixed'}
+
+
+def test_expired_delta_base_gets_full_config(config_dir):
+    with ConfigServer(config_dir, port=0, poll_interval=3600, max_history=1) as config_server:
+        expired_etag = config_server.snapshot.etag
+        for name in ('b', 'cc'):
+            _write(config_dir, 'EXAMPLE.yaml', f'INDEP_ENV:\n  name: {name}\n')
+            assert config_server.refresh()
+        status, headers, body = _get(config_server, {'If-None-Match': expired_etag, 'A-IM': 'config-delta'})
+        assert status == 200
+        assert 'IM' not in headers
+        assert config_server.json_format.loads(body) == {'name': 'cc'}
+
+
+def test_socket_replacement(config_dir):
+    socket_path = os.path.join(config_dir, 'config.sock')
+    # A socket left by a server which did not shut down
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    with ConfigServer(config_dir, socket_path=socket_path, poll_interval=3600) as config_server:
+        assert _get(config_server)[0] == 200
+        with pytest.raises(FileExistsError):
+            ConfigServer(config_dir, socket_path=socket_path, poll_interval=3600).start()
+        assert _get(config_server)[0] == 200
+    assert not os.path.exists(socket_path)
+
+    # Never another file
+    _write(config_dir, 'config.sock', 'not a socket')
+    with pytest.raises(FileExistsError):
+        ConfigServer(config_dir, socket_path=socket_path, poll_interval=3600).start()
+    assert os.path.isfile(socket_path)
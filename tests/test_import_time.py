@@ -0,0 +1,33 @@
+import os
+import shutil
+import compileall
+
+import pytest
+
+from benchmark.import_time import IMPORT_TARGETS, DEFAULT_MAX_MS, measure, check
+
+
+@pytest.mark.parametrize('statement', list(IMPORT_TARGETS))
+def test_import_time(statement):
+    result = measure(statement, repeat=3)
+    deferred = [module for module in IMPORT_TARGETS[statement] if module in result['modules']]
+    assert not deferred, f'{statement} imports {deferred}'
+    assert check({statement: result}, max_ms=DEFAULT_MAX_MS) == []
+
+
+def test_import_time_from_precompiled_files(tmp_path):
+    # As deployed without sources, util is imported from the .pyc files written by compileall
+    util_dir = os.path.join(tmp_path, 'util')
+    shutil.copytree(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'util'),
+                    util_dir,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    assert compileall.compile_dir(util_dir, legacy=True, quiet=1)
+    for file_name in os.listdir(util_dir):
+        if file_name.endswith('.py'):
+            os.remove(os.path.join(util_dir, file_name))
+
+    results = {statement: measure(statement, repeat=3, cwd=str(tmp_path)) for statement in IMPORT_TARGETS}
+    for statement, result in results.items():
+        deferred = [module for module in IMPORT_TARGETS[statement] if module in result['modules']]
+        assert not deferred, f'{statement} imports {deferred}'
+    assert check(results, max_ms=DEFAULT_MAX_MS) == []
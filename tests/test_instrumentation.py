@@ -0,0 +1,59 @@
+import threading
+
+from util.instrumentation import Instrumentation
+
+
+def _counts(instrumentation):
+    return {row['name']: row['count'] for row in instrumentation.stats()}
+
+
+def test_span_stacks_are_per_thread():
+    instrumentation = Instrumentation()
+    instrumentation.enable(trace_memory=True)
+    entered = threading.Barrier(2)
+    errors = list()
+
+    def run(name):
+        try:
+            with instrumentation.span(name):
+                # Both spans are open at once, each thread must pop its own
+                entered.wait(timeout=5)
+                assert [span.name for span in instrumentation.span_stack] == [name]
+                entered.wait(timeout=5)
+            assert instrumentation.span_stack == []
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ('a', 'b')]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        instrumentation.disable()
+    assert errors == []
+    assert _counts(instrumentation) == {'a': 1, 'b': 1}
+
+
+def test_span_exits_after_disable():
+    instrumentation = Instrumentation()
+    instrumentation.enable(trace_memory=True)
+    with instrumentation.span('outer'):
+        with instrumentation.span('inner'):
+            instrumentation.disable()
+            instrumentation.enable(trace_memory=True)
+        assert instrumentation.span_stack == []
+    instrumentation.disable()
+    assert _counts(instrumentation) == {'outer': 1, 'inner': 1}
+
+
+def test_span_exits_after_memory_tracing_is_enabled():
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    with instrumentation.span('outer'):
+        instrumentation.enable(trace_memory=True)
+        with instrumentation.span('inner'):
+            pass
+    instrumentation.disable()
+    assert _counts(instrumentation) == {'outer': 1, 'inner': 1}
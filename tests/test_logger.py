@@ -0,0 +1,81 @@
+import sys
+import json
+import logging
+import threading
+
+import pytest
+
+pytest.importorskip('pytz')
+
+import util.logger  # noqa: E402
+from util.logger import Formatter, JsonFormatter  # noqa: E402
+
+
+def _make_record(message, created=1700000000.5):
+    record = logging.LogRecord(name='test', level=logging.INFO, pathname=__file__, lineno=0,
+                               msg=message, args=None, exc_info=None)
+    record.created = created
+    record.msecs = (created - int(created)) * 1000
+    return record
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+        monkeypatch.setattr(util.logger, '_orjson', None)
+    else:
+        # As if orjson was not installed
+        monkeypatch.setattr(util.logger, '_orjson', False)
+    return request.param
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('loaded', 'loaded'),
+    ({'file': 'A', 'changed': [1, 2.5, None, True]}, {'file': 'A', 'changed': [1, 2.5, None, True]}),
+    # Non string keys
+    ({1: 'a', 2.5: 'b', None: 'c', False: 'd'}, {'1': 'a', '2.5': 'b', 'null': 'c', 'false': 'd'}),
+    ({(1, 2): 'a'}, {'(1, 2)': 'a'}),
+    # Integers larger than 64 bits, orjson falls back to json
+    ({'big': 2 ** 70}, {'big': 2 ** 70}),
+    ({2 ** 70: 'a'}, {str(2 ** 70): 'a'}),
+])
+def test_json_formatter(encoder, message, expected):
+    log_record = json.loads(JsonFormatter().format(_make_record(message)))
+    assert log_record['message'] == expected
+    assert log_record['asctime'] == '2023-11-15T05:13:20.500+07:00'
+    assert (log_record['levelname'], log_record['name']) == ('INFO', 'test')
+
+
+def test_json_formatter_circular_reference(encoder):
+    message = {'a': 1}
+    message['self'] = message
+    log_record = json.loads(JsonFormatter().format(_make_record(message)))
+    assert log_record['message'] == str(message)
+
+
+def test_format_time_shared_by_threads():
+    formatter = Formatter()
+    seconds = [1700000000 + i for i in range(50)]
+    expected = {second: Formatter().formatTime(_make_record('', second + 0.25)) for second in seconds}
+    errors = list()
+
+    def run(offset):
+        for i in range(2000):
+            second = seconds[(i + offset) % len(seconds)]
+            formatted = formatter.formatTime(_make_record('', second + 0.25))
+            if formatted != expected[second]:
+                errors.append((second, formatted))
+
+    threads = [threading.Thread(target=run, args=(offset,)) for offset in range(4)]
+    # Switch threads as often as possible, in the middle of formatTime
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
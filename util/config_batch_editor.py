@@ -0,0 +1,260 @@
+import os
+import sys
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple
+
+import yaml
+from yaml.loader import SafeLoader
+
+from util.config_discovery import ConfigDiscovery
+from util.config_formats import get_format, get_formats, write_atomic
+from util.config_loader import BaseConfigLoader
+
+
+def _to_key(container,
+            key: str,
+            list_key_prefix: str):
+    if isinstance(container, list):
+        if not str(key).startswith(list_key_prefix):
+            raise KeyError(f'{key!r} is not a list element key, expected {list_key_prefix!r}<index>')
+        return int(str(key)[len(list_key_prefix):])
+    return key
+
+
+def _apply_file_patches(file_path: str,
+                        output_file_path: str,
+                        operations: List[Tuple[List[str], str, object]],
+                        list_key_prefix: str,
+                        dry_run: bool) -> Tuple[str, int, Optional[str]]:
+    '''Apply the operations of one file and write it atomically if anything changed.
+    Runs in a worker process, so it only takes and returns picklable values.
+    '''
+    try:
+        config_format = get_format(file_path)
+        with open(file_path, 'rb') as f:
+            config_dict = config_format.loads(f.read())
+        if config_dict is None:
+            config_dict = dict()
+
+        n_changed = 0
+        for keys, op, value in operations:
+            data = config_dict
+            for key in keys[:-1]:
+                key = _to_key(data, key, list_key_prefix)
+                if op == 'set' and isinstance(data, dict) and key not in data:
+                    data[key] = dict()
+                data = data[key]
+            key = _to_key(data, keys[-1], list_key_prefix)
+
+            if op == 'delete':
+                del data[key]
+                n_changed += 1
+            elif isinstance(data, list) and key == len(data):
+                data.append(value)
+                n_changed += 1
+            elif isinstance(data, list) or key in data:
+                if type(data[key]) is not type(value) or data[key] != value:
+                    data[key] = value
+                    n_changed += 1
+            else:
+                data[key] = value
+                n_changed += 1
+
+        if n_changed > 0 and not dry_run:
+            write_atomic(output_file_path, config_format.dumps(config_dict), mode_file_path=file_path)
+        return file_path, n_changed, None
+    except (KeyError, IndexError, TypeError, ValueError, OSError, ImportError, yaml.YAMLError) as e:
+        return file_path, 0, f'{type(e).__name__}: {e}'
+
+
+class ConfigBatchEditor:
+    '''ConfigBatchEditor
+
+    Apply a patch set to many configuration files without the GUI.
+    A patch is a list of operations (file, path, op, value), where path uses the same syntax
+    as the key shown by ConfigEditor, e.g. 'tutorial/-LIST-: 0/yaml/born'.
+
+    - set: Set the value, missing dictionary keys along the path are created,
+           a list element key equal to the list length appends the value.
+    - delete: Delete the key or list element.
+
+    Operations are grouped by file and the files are patched in parallel in a process pool.
+    Only files with a changed value are written, each one atomically.
+
+    :param config_dir: Directory that contains configuration file(s).
+    :type config_dir: str
+
+    :param output_config_dir: Directory to write patched configuration file(s).
+                              If None, overwrite the files in config_dir.
+    :type output_config_dir: str, optional, defaults to None
+
+    :param workers: Number of worker processes. If None, use the number of CPUs.
+                    If 1, patch in the current process.
+    :type workers: int, optional, defaults to None
+
+    :param key_seperator: Separator of keys in a path.
+    :type key_seperator: str, optional, defaults to '/'
+
+    :param list_key_prefix: Key prefix of list elements.
+    :type list_key_prefix: str, optional, defaults to '-LIST-: '
+
+    :param discovery: Discovery of configuration files, used to resolve a file given by its key
+                      as shown by ConfigEditor, e.g. 'nested/EXAMPLE_1'. If None, discover files directly in config_dir.
+    :type discovery: ConfigDiscovery, optional, defaults to None
+
+    '''
+    operations = ('set', 'delete')
+
+    def __init__(self,
+                 config_dir: str,
+                 output_config_dir: Optional[str] = None,
+                 workers: Optional[int] = None,
+                 key_seperator: Optional[str] = '/',
+                 list_key_prefix: Optional[str] = '-LIST-: ',
+                 discovery: Optional[ConfigDiscovery] = None):
+        self.config_dir = config_dir
+        self.output_config_dir = config_dir if output_config_dir is None else output_config_dir
+        self.workers = workers
+        self.key_seperator = key_seperator
+        self.list_key_prefix = list_key_prefix
+        self.discovery = ConfigDiscovery() if discovery is None else discovery
+        self.__file_names_by_key: Optional[Dict[str, str]] = None
+
+    def read_patch_file(self,
+                        patch_file_path: str) -> List[tuple]:
+        '''Returns operations read from a YAML or JSON patch file.
+
+        The file contains a list of operations, each one either a mapping
+        {file: ..., path: ..., op: ..., value: ...} or a list [file, path, op, value].
+
+        :param patch_file_path: Path of the patch file.
+        :type patch_file_path: str
+
+        :rtype: list
+        :return: List of (file, path, op, value)
+
+        '''
+        with open(patch_file_path, 'rb') as f:
+            records = yaml.load(f, Loader=SafeLoader) or list()
+
+        patches = list()
+        for record in records:
+            if isinstance(record, dict):
+                patches.append((record['file'], record['path'], record.get('op', 'set'), record.get('value')))
+            else:
+                file_name, path, op, *value = record
+                patches.append((file_name, path, op, value[0] if value else None))
+        return patches
+
+    def _get_file_name(self,
+                       file_name: str) -> str:
+        # Accept both 'EXAMPLE_1' as shown by ConfigEditor and 'EXAMPLE_1.yaml'
+        try:
+            get_format(file_name)
+            return file_name
+        except ValueError:
+            pass
+        if self.__file_names_by_key is None:
+            # Same keys as the loaders, e.g. 'nested/EXAMPLE_1' for 'nested/EXAMPLE_1.yml'
+            self.__file_names_by_key = BaseConfigLoader._get_config_file_names_by_key(self.discovery.discover(self.config_dir))
+        if file_name in self.__file_names_by_key:
+            return self.__file_names_by_key[file_name]
+
+        # Not discovered, e.g. in a subdirectory, look for a file of any registered format
+        candidates = [f'{file_name}{extension}' for config_format in get_formats().values()
+                      for extension in config_format.extensions
+                      if os.path.isfile(os.path.join(self.config_dir, f'{file_name}{extension}'))]
+        if len(candidates) > 1:
+            raise ValueError(f'{file_name!r} matches several files: {candidates}, give the file name with its extension')
+        if not candidates:
+            # Reported as a missing file by apply
+            return f'{file_name}.yaml'
+        return candidates[0]
+
+    def group_by_file(self,
+                      patches: List[tuple]) -> Dict[str, List[Tuple[List[str], str, object]]]:
+        '''Returns operations grouped by file name, in their original order within each file.
+
+        :param patches: List of (file, path, op, value).
+        :type patches: list
+
+        :rtype: dict
+        :return: {file name: [(keys, op, value)]}
+
+        '''
+        grouped = OrderedDict()
+        # Discovered on the first file given by its key, files may have been added since the last patch set
+        self.__file_names_by_key = None
+        for file_name, path, op, value in patches:
+            if op not in self.operations:
+                raise ValueError(f'Unknown operation {op!r} for {file_name}:{path}, expected one of {self.operations}')
+            keys = str(path).strip(self.key_seperator).split(self.key_seperator)
+            grouped.setdefault(self._get_file_name(str(file_name)), list()).append((keys, op, value))
+        return grouped
+
+    def apply(self,
+              patches: List[tuple],
+              dry_run: Optional[bool] = False) -> Dict[str, Tuple[int, Optional[str]]]:
+        '''Apply operations and returns the result of every touched file.
+
+        A file with a failing operation is not written.
+
+        :param patches: List of (file, path, op, value).
+        :type patches: list
+
+        :param dry_run: Apply the operations without writing any file.
+        :type dry_run: bool, optional, defaults to False
+
+        :rtype: dict
+        :return: {file name relative to config_dir: (number of changed values, error message or None)}
+
+        '''
+        grouped = self.group_by_file(patches)
+        jobs = [(os.path.join(self.config_dir, file_name),
+                 os.path.join(self.output_config_dir, file_name),
+                 operations,
+                 self.list_key_prefix,
+                 dry_run) for file_name, operations in grouped.items()]
+
+        if self.workers == 1 or len(jobs) <= 1:
+            results = [_apply_file_patches(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunksize = max(1, len(jobs) // ((self.workers or os.cpu_count() or 1) * 4))
+                results = list(executor.map(_apply_file_patches, *zip(*jobs), chunksize=chunksize))
+
+        # Results are in the order of jobs, keyed by the relative file name so files of subdirectories stay apart
+        return {file_name: (n_changed, error) for file_name, (file_path, n_changed, error) in zip(grouped, results)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Apply a patch file of (file, path, op, value) operations to configuration files.')
+    parser.add_argument('patch_file', help='YAML or JSON patch file')
+    parser.add_argument('--config-dir', required=True, help='Directory that contains configuration file(s)')
+    parser.add_argument('--output-config-dir', default=None, help='Directory to write patched file(s), defaults to --config-dir')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--recursive', action='store_true', help='Also resolve file keys in subdirectories, e.g. nested/EXAMPLE_1')
+    parser.add_argument('--dry-run', action='store_true', help='Apply without writing any file')
+    args = parser.parse_args(argv)
+
+    batch_editor = ConfigBatchEditor(config_dir=args.config_dir,
+                                     output_config_dir=args.output_config_dir,
+                                     workers=args.workers,
+                                     discovery=ConfigDiscovery(recursive=args.recursive))
+    results = batch_editor.apply(batch_editor.read_patch_file(args.patch_file),
+                                 dry_run=args.dry_run)
+
+    n_errors = 0
+    for file_name, (n_changed, error) in results.items():
+        if error is None:
+            print(f'{file_name}: {n_changed} changed')
+        else:
+            n_errors += 1
+            print(f'{file_name}: {error}', file=sys.stderr)
+    return 1 if n_errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
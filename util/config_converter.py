@@ -0,0 +1,147 @@
+import os
+import sys
+import math
+import argparse
+from typing import Optional, Dict, List, Tuple
+
+import yaml
+
+from util.config_discovery import ConfigDiscovery
+from util.config_formats import ConfigFormat, get_format, get_formats, get_patterns, write_atomic
+
+
+def is_identical(a: object,
+                 b: object) -> bool:
+    '''Returns whether two parsed configurations are equal with the same types and the same key order,
+    e.g. 1 and 1.0 or True and 1 are different, NaN equals NaN.
+    '''
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(is_identical(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(is_identical(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and math.isnan(a):
+        return math.isnan(b)
+    return a == b
+
+
+class ConfigConverter:
+    '''ConfigConverter
+
+    Convert configuration files to another format, e.g. YAML to JSON, which is much faster to parse.
+    Every converted file is parsed again and compared with the source, a file whose values or types
+    do not survive the round trip (e.g. dates or integer keys in JSON) is reported and not written.
+
+    :param config_dir: Directory that contains configuration file(s).
+    :type config_dir: str
+
+    :param output_config_dir: Directory to write converted file(s), with the same relative paths.
+    :type output_config_dir: str
+
+    :param to_format: Name of the target format, see util.config_formats.get_formats.
+    :type to_format: str, optional, defaults to 'json'
+
+    :param discovery: Discovery of configuration files to convert.
+                      If None, discover YAML files directly in config_dir.
+    :type discovery: ConfigDiscovery, optional, defaults to None
+
+    '''
+    def __init__(self,
+                 config_dir: str,
+                 output_config_dir: str,
+                 to_format: Optional[str] = 'json',
+                 discovery: Optional[ConfigDiscovery] = None):
+        formats = get_formats()
+        if to_format not in formats:
+            raise ValueError(f'Format {to_format!r} is not available, available: {sorted(formats)}')
+        self.config_dir = config_dir
+        self.output_config_dir = output_config_dir
+        self.to_format: ConfigFormat = formats[to_format]
+        self.discovery = ConfigDiscovery() if discovery is None else discovery
+
+    def _get_output_file_name(self,
+                              config_file_name: str) -> str:
+        return f'{os.path.splitext(config_file_name)[0]}{self.to_format.extensions[0]}'
+
+    def convert_file(self,
+                     config_file_name: str,
+                     dry_run: Optional[bool] = False) -> str:
+        '''Convert one file, verify the round trip and write it atomically.
+
+        :param config_file_name: File name relative to config_dir.
+        :type config_file_name: str
+
+        :param dry_run: Convert and verify without writing.
+        :type dry_run: bool, optional, defaults to False
+
+        :rtype: str
+        :return: Output file name relative to output_config_dir
+
+        '''
+        with open(os.path.join(self.config_dir, config_file_name), 'rb') as f:
+            data = f.read()
+        config_dict = get_format(config_file_name).loads(data)
+        converted = self.to_format.dumps(config_dict)
+        if not is_identical(config_dict, self.to_format.loads(converted)):
+            raise ValueError(f'{config_file_name} does not round trip through {self.to_format.name}')
+
+        output_file_name = self._get_output_file_name(config_file_name)
+        if not dry_run:
+            write_atomic(os.path.join(self.output_config_dir, output_file_name),
+                         converted,
+                         mode_file_path=os.path.join(self.config_dir, config_file_name))
+        return output_file_name
+
+    def convert(self,
+                dry_run: Optional[bool] = False) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        '''Convert every discovered file which is not in the target format yet.
+
+        :param dry_run: Convert and verify without writing any file.
+        :type dry_run: bool, optional, defaults to False
+
+        :rtype: dict
+        :return: {config file name: (output file name or None, error message or None)}
+
+        '''
+        results = dict()
+        for config_file_name in self.discovery.discover(self.config_dir):
+            if get_format(config_file_name) is self.to_format:
+                continue
+            try:
+                results[config_file_name] = (self.convert_file(config_file_name, dry_run=dry_run), None)
+            except (ValueError, TypeError, OverflowError, OSError, ImportError, yaml.YAMLError) as e:
+                # Reported per file, the other files are still converted
+                results[config_file_name] = (None, f'{type(e).__name__}: {e}')
+        return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Convert configuration files to another format with a verified round trip.')
+    parser.add_argument('--config-dir', required=True, help='Directory that contains configuration file(s)')
+    parser.add_argument('--output-config-dir', required=True, help='Directory to write converted file(s)')
+    parser.add_argument('--format', default='json', choices=sorted(get_formats()), help='Target format')
+    parser.add_argument('--recursive', action='store_true', help='Also convert files in subdirectories')
+    parser.add_argument('--all-formats', action='store_true', help='Convert files of every available format, not only YAML')
+    parser.add_argument('--dry-run', action='store_true', help='Convert and verify without writing any file')
+    args = parser.parse_args(argv)
+
+    converter = ConfigConverter(config_dir=args.config_dir,
+                                output_config_dir=args.output_config_dir,
+                                to_format=args.format,
+                                discovery=ConfigDiscovery(include=get_patterns() if args.all_formats else ('*.yaml', '*.yml'),
+                                                          recursive=args.recursive))
+    results = converter.convert(dry_run=args.dry_run)
+
+    n_errors = 0
+    for config_file_name, (output_file_name, error) in results.items():
+        if error is None:
+            print(f'{config_file_name} -> {output_file_name}')
+        else:
+            n_errors += 1
+            print(f'{config_file_name}: {error}', file=sys.stderr)
+    return 1 if n_errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+from typing import Optional, Set, Tuple
+
+
+class ConfigDiff:
+    '''ConfigDiff
+
+    Structural difference between a source and a target configuration, compared by path.
+    A path is a tuple of keys, list elements use the same '-LIST-: i' keys as ConfigMelter.
+    Only the top-most differing path of a subtree is recorded:
+
+    - added: path exists in target only.
+    - removed: path exists in source only.
+    - changed: path exists in both, with a different value or a different type.
+
+    Subtrees shared by identity are skipped, so every node is visited at most once.
+
+    :param source: Configuration to compare from, e.g. the loaded configuration.
+    :type source: dict
+
+    :param target: Configuration to compare to, e.g. the edited configuration.
+    :type target: dict
+
+    :param list_key_prefix: Key prefix of list elements.
+    :type list_key_prefix: str, optional, defaults to '-LIST-: '
+
+    '''
+    _missing = object()
+
+    def __init__(self,
+                 source: dict,
+                 target: dict,
+                 list_key_prefix: Optional[str] = '-LIST-: '):
+        self.list_key_prefix = list_key_prefix
+        self.added: Set[tuple] = set()
+        self.removed: Set[tuple] = set()
+        self.changed: Set[tuple] = set()
+        self._compare(source, target, ())
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __repr__(self):
+        return f'ConfigDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})'
+
+    def paths(self) -> Set[tuple]:
+        '''Returns every added, removed and changed path.
+        '''
+        return self.added | self.removed | self.changed
+
+    def _compare(self,
+                 source,
+                 target,
+                 path: tuple):
+        if source is target:
+            return
+        if source is self._missing:
+            self.added.add(path)
+        elif target is self._missing:
+            self.removed.add(path)
+        elif isinstance(source, dict) and isinstance(target, dict):
+            for key, value in source.items():
+                other = target.get(key, self._missing)
+                if not self._is_same(value, other):
+                    self._compare(value, other, path + (key,))
+            for key in target:
+                if key not in source:
+                    self.added.add(path + (key,))
+        elif isinstance(source, list) and isinstance(target, list):
+            prefix = self.list_key_prefix
+            for i, (value, other) in enumerate(zip(source, target)):
+                if not self._is_same(value, other):
+                    self._compare(value, other, path + (f'{prefix}{i}',))
+            for i in range(len(target), len(source)):
+                self.removed.add(path + (f'{prefix}{i}',))
+            for i in range(len(source), len(target)):
+                self.added.add(path + (f'{prefix}{i}',))
+        elif type(source) is not type(target) or source != target:
+            self.changed.add(path)
+
+    @staticmethod
+    def _is_same(value, other) -> bool:
+        # Equal scalars are compared inline, containers are always walked to find the differing path
+        if value is other:
+            return True
+        return type(value) is type(other) and not isinstance(value, (dict, list)) and value == other
+
+    def get_value(self,
+                  config: dict,
+                  path: tuple,
+                  default: object = None) -> object:
+        '''Returns the value at path, or default if the path does not exist.
+        '''
+        value = config
+        for key in path:
+            if isinstance(value, dict):
+                value = value.get(key, self._missing)
+            elif isinstance(value, list) and str(key).startswith(self.list_key_prefix):
+                i = int(key[len(self.list_key_prefix):])
+                value = value[i] if i < len(value) else self._missing
+            else:
+                value = self._missing
+            if value is self._missing:
+                return default
+        return value
+
+    def update(self,
+               source: dict,
+               target: dict,
+               path: Tuple) -> Set[tuple]:
+        '''Re-compare only the subtree at path, e.g. after the value at path has been edited or deleted.
+
+        :param source: Configuration to compare from.
+        :type source: dict
+
+        :param target: Configuration to compare to.
+        :type target: dict
+
+        :param path: Path of the edited subtree.
+        :type path: tuple
+
+        :rtype: set
+        :return: Paths whose difference status may have changed.
+
+        '''
+        path = tuple(path)
+        for i in range(len(path)):
+            # The whole subtree is already recorded at an ancestor
+            if path[:i] in self.added or path[:i] in self.removed or path[:i] in self.changed:
+                return set()
+
+        affected = {path}
+        depth = len(path)
+        for paths in (self.added, self.removed, self.changed):
+            stale = {p for p in paths if p[:depth] == path}
+            paths -= stale
+            affected |= stale
+
+        self._compare(self.get_value(source, path, self._missing),
+                      self.get_value(target, path, self._missing),
+                      path)
+        for paths in (self.added, self.removed, self.changed):
+            affected |= {p for p in paths if p[:depth] == path}
+        return affected
@@ -0,0 +1,142 @@
+import os
+import stat
+import time
+import threading
+from fnmatch import fnmatchcase
+from typing import Optional, Dict, List, Tuple
+
+from util.instrumentation import span
+
+
+# {directory path: (directory mtime_ns, [(entry name, is directory)])}
+_listing_cache: Dict[str, Tuple[int, List[Tuple[str, bool]]]] = dict()
+_listing_cache_lock = threading.Lock()
+# Filesystems keep mtimes as coarse as 2 seconds (FAT), an entry added in the same tick as a listing
+# does not change the mtime of its directory, so the listing of a directory modified since is not memoized
+_mtime_granularity_ns = 2_000_000_000
+
+
+def clear_listing_cache():
+    '''Forget every memoized directory listing.
+    '''
+    with _listing_cache_lock:
+        _listing_cache.clear()
+
+
+class ConfigDiscovery:
+    '''ConfigDiscovery
+
+    Find configuration files with os.scandir.
+    Directory listings are memoized by the mtime of the directory, which changes whenever an entry
+    is added, removed or renamed, so a rescan of an unchanged tree only stats its directories and matching files.
+    A directory reached again through a symbolic link is scanned once.
+    The stat result of every discovered file is kept in stats, for freshness checks of loaded files.
+
+    Patterns are matched with fnmatch against the path relative to config_dir with '/' separators.
+    A pattern without '/' is also matched against the file or directory name alone.
+
+    :param include: Patterns of files to discover, util.config_formats.get_patterns() for every available format.
+    :type include: tuple, optional, defaults to ('*.yaml', '*.yml')
+
+    :param exclude: Patterns of files and directories to skip, an excluded directory is not scanned.
+    :type exclude: tuple, optional, defaults to ()
+
+    :param recursive: Also discover files in subdirectories.
+    :type recursive: bool, optional, defaults to False
+
+    '''
+    def __init__(self,
+                 include: Optional[Tuple[str, ...]] = ('*.yaml', '*.yml'),
+                 exclude: Optional[Tuple[str, ...]] = (),
+                 recursive: Optional[bool] = False):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.recursive = recursive
+        self.stats: Dict[str, os.stat_result] = dict()
+
+    @staticmethod
+    def _match(relative_path: str,
+               name: str,
+               patterns: Tuple[str, ...]) -> bool:
+        for pattern in patterns:
+            if fnmatchcase(relative_path, pattern) or ('/' not in pattern and fnmatchcase(name, pattern)):
+                return True
+        return False
+
+    @staticmethod
+    def _list_dir(dir_path: str) -> Tuple[os.stat_result, List[Tuple[str, bool]]]:
+        '''Returns the stat result of a directory and its entries.
+        '''
+        dir_stat = os.stat(dir_path)
+        cached = _listing_cache.get(dir_path)
+        if cached is not None and cached[0] == dir_stat.st_mtime_ns:
+            return dir_stat, cached[1]
+
+        scan_time_ns = time.time_ns()
+        entries = list()
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    # Removed while scanning
+                    continue
+                entries.append((entry.name, is_dir))
+        entries.sort()
+        if scan_time_ns - dir_stat.st_mtime_ns > _mtime_granularity_ns:
+            with _listing_cache_lock:
+                _listing_cache[dir_path] = (dir_stat.st_mtime_ns, entries)
+        return dir_stat, entries
+
+    def discover(self,
+                 config_dir: str) -> List[str]:
+        '''Returns paths of configuration files relative to config_dir, sorted, with '/' separators.
+
+        :param config_dir: Directory that contains configuration file(s), with or without a trailing separator.
+        :type config_dir: str
+
+        :rtype: list
+        :return: Relative paths of configuration files
+
+        '''
+        with span('ConfigDiscovery.discover', config_dir):
+            config_dir = os.path.normpath(config_dir)
+            self.stats = dict()
+            file_names = list()
+            # (st_dev, st_ino) of the scanned directories, a symbolic link to a parent directory would loop
+            visited_dirs = set()
+            pending = ['']
+            while pending:
+                relative_dir = pending.pop()
+                dir_path = os.path.join(config_dir, relative_dir) if relative_dir else config_dir
+                try:
+                    dir_stat, entries = self._list_dir(dir_path)
+                except OSError:
+                    if not relative_dir:
+                        raise
+                    # A subdirectory removed or not readable
+                    continue
+                dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+                if dir_id in visited_dirs:
+                    continue
+                visited_dirs.add(dir_id)
+                for name, is_dir in entries:
+                    relative_path = f'{relative_dir}/{name}' if relative_dir else name
+                    if self.exclude and self._match(relative_path, name, self.exclude):
+                        continue
+                    if is_dir:
+                        if self.recursive:
+                            pending.append(relative_path)
+                    elif self._match(relative_path, name, self.include):
+                        # Only the matching files are stated
+                        try:
+                            file_stat = os.stat(os.path.join(dir_path, name))
+                        except OSError:
+                            # Removed since the listing, or a broken symbolic link
+                            continue
+                        if not stat.S_ISREG(file_stat.st_mode):
+                            continue
+                        self.stats[relative_path] = file_stat
+                        file_names.append(relative_path)
+            file_names.sort()
+        return file_names
@@ -0,0 +1,214 @@
+import os
+from typing import Optional, Dict, Tuple
+
+
+class ConfigFormat:
+    '''ConfigFormat
+
+    Serialization of configuration dictionaries for the files of some extensions.
+    The module of a format is imported on the first file read or written, a format whose module
+    is not installed is registered but not available, so discovery skips its files.
+
+    :param name: Name of the format, e.g. 'json'.
+    :type name: str
+
+    :param extensions: File extensions handled by the format, with the leading dot.
+    :type extensions: tuple
+
+    :param module: Module the format needs, checked by is_available. If None, the format is always available.
+    :type module: str, optional, defaults to None
+
+    '''
+    def __init__(self,
+                 name: str,
+                 extensions: Tuple[str, ...],
+                 module: Optional[str] = None):
+        self.name = name
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.module = module
+        self.__available = None
+
+    def is_available(self) -> bool:
+        '''Returns whether the module of the format is installed, without importing it.
+        '''
+        if self.__available is None:
+            import importlib.util
+            self.__available = self.module is None or importlib.util.find_spec(self.module) is not None
+        return self.__available
+
+    def loads(self, data: bytes) -> object:
+        '''Returns the configuration parsed from the content of a file.
+        '''
+        raise NotImplementedError
+
+    def dumps(self, config_dict: object) -> bytes:
+        '''Returns the content of a file which holds config_dict.
+        '''
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.name!r}, {self.extensions})'
+
+
+class YamlFormat(ConfigFormat):
+    '''YAML with the safe loader, the format written by ConfigEditor since the beginning.
+    '''
+    def __init__(self):
+        super().__init__(name='yaml', extensions=('.yaml', '.yml'), module='yaml')
+
+    def loads(self, data: bytes) -> object:
+        import yaml
+        return yaml.load(data, Loader=yaml.SafeLoader)
+
+    def dumps(self, config_dict: object) -> bytes:
+        import yaml
+        return yaml.dump(config_dict, sort_keys=False).encode()
+
+
+class JsonFormat(ConfigFormat):
+    '''JSON, decoded and encoded with orjson when installed, otherwise the standard json module.
+    '''
+    def __init__(self):
+        super().__init__(name='json', extensions=('.json',))
+        self.__orjson = None
+
+    def _import_orjson(self):
+        if self.__orjson is None:
+            try:
+                import orjson
+                self.__orjson = orjson
+            except ImportError:
+                self.__orjson = False
+        return self.__orjson
+
+    def loads(self, data: bytes) -> object:
+        orjson = self._import_orjson()
+        if orjson:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # e.g. integers larger than 64 bits, let the standard decoder parse or report it
+                pass
+        import json
+        return json.loads(data)
+
+    def dumps(self, config_dict: object) -> bytes:
+        orjson = self._import_orjson()
+        if orjson:
+            try:
+                return orjson.dumps(config_dict, option=orjson.OPT_INDENT_2) + b'\n'
+            except TypeError:
+                # e.g. integers larger than 64 bits or non string keys, fall back to the standard encoder
+                pass
+        import json
+        return json.dumps(config_dict, indent=2, ensure_ascii=False).encode() + b'\n'
+
+
+class MsgpackFormat(ConfigFormat):
+    '''MessagePack, available when the msgpack package is installed.
+    '''
+    def __init__(self):
+        super().__init__(name='msgpack', extensions=('.msgpack', '.mpk'), module='msgpack')
+
+    def loads(self, data: bytes) -> object:
+        import msgpack
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def dumps(self, config_dict: object) -> bytes:
+        import msgpack
+        return msgpack.packb(config_dict, use_bin_type=True)
+
+
+# {extension: format}
+_formats: Dict[str, ConfigFormat] = dict()
+
+
+def register_format(config_format: ConfigFormat,
+                    replace: Optional[bool] = False):
+    '''Register a format for its extensions.
+
+    :param config_format: Format to register.
+    :type config_format: ConfigFormat
+
+    :param replace: Replace the format registered before for the same extension.
+    :type replace: bool, optional, defaults to False
+
+    '''
+    for extension in config_format.extensions:
+        if not replace and extension in _formats:
+            raise ValueError(f'{extension!r} is already registered to {_formats[extension]!r}')
+    for extension in config_format.extensions:
+        _formats[extension] = config_format
+
+
+def get_formats(available: Optional[bool] = True) -> Dict[str, ConfigFormat]:
+    '''Returns registered formats by name, only the available ones if available is True.
+    '''
+    return {config_format.name: config_format for config_format in _formats.values()
+            if not available or config_format.is_available()}
+
+
+def get_format(file_name: str) -> ConfigFormat:
+    '''Returns the format of a file by its extension.
+
+    :param file_name: File name or path.
+    :type file_name: str
+
+    :rtype: ConfigFormat
+    :return: Registered format
+
+    '''
+    extension = os.path.splitext(file_name)[1].lower()
+    config_format = _formats.get(extension)
+    if config_format is None:
+        raise ValueError(f'No format is registered for {extension!r} of {file_name}, registered: {sorted(_formats)}')
+    return config_format
+
+
+def get_patterns(available: Optional[bool] = True) -> Tuple[str, ...]:
+    '''Returns discovery patterns of the registered extensions, e.g. ('*.yaml', '*.yml', '*.json').
+    '''
+    return tuple(f'*{extension}' for extension, config_format in _formats.items()
+                 if not available or config_format.is_available())
+
+
+def write_atomic(file_path: str,
+                 data: bytes,
+                 mode_file_path: Optional[str] = None):
+    '''Write data to a file through a temporary file in the same directory renamed over it,
+    so readers never see a half written file. Missing directories are created.
+
+    :param file_path: Path of the file to write.
+    :type file_path: str
+
+    :param data: Content of the file.
+    :type data: bytes
+
+    :param mode_file_path: File whose permissions the written file gets, e.g. the source of a converted file.
+                           If None or missing, the file is readable by everyone and writable by its owner.
+    :type mode_file_path: str, optional, defaults to None
+
+    '''
+    import stat
+    import tempfile
+    output_dir = os.path.dirname(file_path) or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file readable by its owner only
+        try:
+            mode = stat.S_IMODE(os.stat(mode_file_path).st_mode) if mode_file_path is not None else 0o644
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+register_format(YamlFormat())
+register_format(JsonFormat())
+register_format(MsgpackFormat())
@@ -0,0 +1,532 @@
+from bisect import bisect_left, insort
+from typing import Optional, Literal, Dict, List, Set, Iterator
+
+
+class ConfigIndex:
+    '''ConfigIndex
+
+    Inverted index over the path segments and stringified values of a melted configuration tree.
+    Every item is identified by the same iid as its Treeview row, which lets a search be turned
+    into the minimal set of children lists to change in the tree.
+
+    :param iid_seperator: Separator used to join path segments into an iid.
+    :type iid_seperator: str, optional, defaults to '__'
+
+    '''
+    _no_value = object()
+    _token_seperator = '\x00'
+
+    def __init__(self,
+                 iid_seperator: Optional[str] = '__'):
+        self.iid_seperator = iid_seperator
+        # Whether the last search stopped at max_matches
+        self.is_search_truncated = False
+        self.clear()
+
+    def clear(self):
+        '''Remove every item from the index.
+        '''
+        self.__postings: Dict[str, Set[str]] = dict()
+        self.__item_tokens: Dict[str, tuple] = dict()
+        self.__parent: Dict[str, str] = dict()
+        self.__children: Dict[str, Dict[str, None]] = {'': dict()}
+        # Position of every item among its siblings, increasing in children order
+        self.__order: Dict[str, int] = dict()
+        self.__next_order = 0
+        self.__sorted_tokens: List[str] = list()
+        # Tokens added by add_records, merged into the sorted tokens at once
+        self.__unsorted_tokens: List[str] = list()
+        self.__sorted_tokens_stale = False
+        self.__adding_records = False
+        # Tokens joined for substring search, new tokens are appended
+        # and removed ones are dropped once the blob is rebuilt
+        self.__blob = self._token_seperator
+        self.__unjoined_tokens: List[str] = list()
+        self.__n_blob_removed = 0
+        # Children lists currently shown in the tree for parents that hide some of their children
+        self.__shown: Dict[str, List[str]] = dict()
+
+    def __len__(self):
+        return len(self.__parent)
+
+    def __contains__(self, iid):
+        return iid in self.__parent
+
+    def get_parent(self,
+                   iid: str) -> str:
+        '''Returns the parent iid, '' for a root item.
+        '''
+        return self.__parent[iid]
+
+    def get_children(self,
+                     iid: str) -> List[str]:
+        '''Returns child iids in insertion order, including the ones hidden by a filter.
+        '''
+        return list(self.__children.get(iid, ()))
+
+    def get_shown_children(self,
+                           iid: str) -> List[str]:
+        '''Returns child iids currently shown in the tree, in order.
+        '''
+        shown = self.__shown.get(iid)
+        if shown is None:
+            return self.get_children(iid)
+        return list(shown)
+
+    def iter_subtree(self,
+                     iid: str):
+        '''Yields the item and all of its descendants.
+        '''
+        stack = [iid]
+        while stack:
+            item = stack.pop()
+            yield item
+            stack.extend(self.__children.get(item, ()))
+
+    def get_detached(self,
+                     iid: str) -> List[str]:
+        '''Returns the items in the subtree of iid which a filter has hidden from their parent.
+        A hidden item is detached from the tree, deleting its ancestor does not delete it.
+        '''
+        detached = list()
+        for item in self.iter_subtree(iid):
+            shown = self.__shown.get(item)
+            if shown is not None:
+                shown = set(shown)
+                detached.extend(child for child in self.__children.get(item, ()) if child not in shown)
+        return detached
+
+    @classmethod
+    def _normalize(cls, text) -> str:
+        return str(text).lower().replace(cls._token_seperator, ' ')
+
+    def _add_token(self, token: str, iid: str):
+        posting = self.__postings.get(token)
+        if posting is None:
+            self.__postings[token] = {iid}
+            if self.__adding_records:
+                self.__unsorted_tokens.append(token)
+            else:
+                insort(self.__sorted_tokens, token)
+            self.__unjoined_tokens.append(token)
+        else:
+            posting.add(iid)
+
+    def _remove_token(self, token: str, iid: str):
+        posting = self.__postings[token]
+        posting.discard(iid)
+        if not posting:
+            del self.__postings[token]
+            if self.__adding_records:
+                self.__sorted_tokens_stale = True
+            else:
+                del self.__sorted_tokens[bisect_left(self.__sorted_tokens, token)]
+            self.__n_blob_removed += 1
+
+    def add_item(self,
+                 iid: str,
+                 parent: str,
+                 text: str,
+                 value: object = _no_value,
+                 index: Optional[int] = None):
+        '''Add one tree item to the index.
+
+        :param iid: Item id, same as the Treeview iid.
+        :type iid: str
+
+        :param parent: Parent item id, '' for a root item.
+        :type parent: str
+
+        :param text: Path segment shown for the item.
+        :type text: str
+
+        :param value: Value of a leaf item, omitted for a key item.
+        :type value: object, optional
+
+        :param index: Position among the children of parent, appended if None.
+        :type index: int, optional, defaults to None
+
+        '''
+        if iid in self.__parent:
+            return
+        tokens = [self._normalize(text)]
+        if value is not self._no_value:
+            tokens.append(self._normalize(value))
+        self._insert_item(iid, parent, tuple(dict.fromkeys(tokens)), index)
+
+    def _insert_item(self,
+                     iid: str,
+                     parent: str,
+                     tokens: tuple,
+                     index: Optional[int]):
+        for token in tokens:
+            self._add_token(token, iid)
+        self.__item_tokens[iid] = tokens
+        self.__parent[iid] = parent
+        children = self.__children.setdefault(parent, dict())
+        if index is None or index >= len(children):
+            children[iid] = None
+            self.__order[iid] = self.__next_order
+            self.__next_order += 1
+        else:
+            children = list(children)
+            children.insert(index, iid)
+            self.__children[parent] = dict.fromkeys(children)
+            for child in children:
+                self.__order[child] = self.__next_order
+                self.__next_order += 1
+        if parent in self.__shown:
+            self.__shown[parent].append(iid)
+
+    def add_records(self,
+                    root_name: str,
+                    config_list: List[list]):
+        '''Add the records returned by ConfigMelter.melt for one configuration file.
+
+        :param root_name: Name of the configuration file.
+        :type root_name: str
+
+        :param config_list: Melted records, [state, key, value].
+        :type config_list: list
+
+        '''
+        # Sort the new tokens once instead of inserting them one by one
+        self.__adding_records = True
+        self.add_item(iid=root_name, parent='', text=root_name)
+        known = self.__parent
+        for state, key, value in config_list:
+            parent = root_name
+            for segment in state:
+                iid = f'{parent}{self.iid_seperator}{segment}'
+                if iid not in known:
+                    self.add_item(iid=iid, parent=parent, text=segment)
+                parent = iid
+            self.add_item(iid=f'{parent}{self.iid_seperator}{key}', parent=parent, text=key, value=value)
+        self.__adding_records = False
+        # Build the search structures now, so the first search does not pay for them
+        self._get_sorted_tokens()
+        self._get_blob()
+
+    def add_group(self,
+                  iid: str,
+                  parent: str,
+                  children: List[str],
+                  index: Optional[int] = None):
+        '''Add an item under parent which takes over some of the children of parent,
+        e.g. a page of the elements of a long list. A group is never matched by a search itself.
+
+        :param iid: Item id of the group.
+        :type iid: str
+
+        :param parent: Parent item id.
+        :type parent: str
+
+        :param children: Children of parent to move into the group, in order.
+        :type children: list
+
+        :param index: Position among the children of parent, appended if None.
+        :type index: int, optional, defaults to None
+
+        '''
+        if iid in self.__parent:
+            return
+        self._insert_item(iid, parent, tuple(), index)
+        parent_children = self.__children[parent]
+        group_children = self.__children.setdefault(iid, dict())
+        for child in children:
+            del parent_children[child]
+            group_children[child] = None
+            self.__parent[child] = iid
+        if parent in self.__shown:
+            moved = set(children)
+            self.__shown[parent] = [child for child in self.__shown[parent] if child not in moved]
+
+    def move(self,
+             iid: str,
+             index: int):
+        '''Move an item to another position among the children of its parent,
+        e.g. after the keys of a dictionary were reordered.
+
+        :param iid: Item id.
+        :type iid: str
+
+        :param index: New position among the children of its parent, including the ones hidden by a filter.
+        :type index: int
+
+        '''
+        parent = self.__parent[iid]
+        children = list(self.__children[parent])
+        children.remove(iid)
+        children.insert(index, iid)
+        self.__children[parent] = dict.fromkeys(children)
+        for child in children:
+            self.__order[child] = self.__next_order
+            self.__next_order += 1
+        if parent in self.__shown:
+            shown = set(self.__shown[parent])
+            self.__shown[parent] = [child for child in children if child in shown]
+
+    def update_value(self,
+                     iid: str,
+                     value: object):
+        '''Re-index the value of a leaf item after it has been edited.
+        '''
+        text_token = self.__item_tokens[iid][0]
+        for token in self.__item_tokens[iid]:
+            self._remove_token(token, iid)
+        tokens = tuple(dict.fromkeys([text_token, self._normalize(value)]))
+        for token in tokens:
+            self._add_token(token, iid)
+        self.__item_tokens[iid] = tokens
+
+    def update_values(self,
+                      values: Dict[str, object]):
+        '''Re-index the values of many leaf items, e.g. after a bulk edit, {iid: value}.
+        The tokens are sorted once instead of being inserted one by one.
+        '''
+        self.__adding_records = True
+        for iid, value in values.items():
+            self.update_value(iid, value)
+        self.__adding_records = False
+        self._get_sorted_tokens()
+        self._get_blob()
+
+    def remove(self,
+               iid: str):
+        '''Remove an item and all of its descendants from the index.
+        '''
+        if iid not in self.__parent:
+            return
+        parent = self.__parent[iid]
+        del self.__children[parent][iid]
+        if parent in self.__shown and iid in self.__shown[parent]:
+            self.__shown[parent].remove(iid)
+        stack = [iid]
+        while stack:
+            item = stack.pop()
+            stack.extend(self.__children.pop(item, ()))
+            for token in self.__item_tokens.pop(item):
+                self._remove_token(token, item)
+            del self.__parent[item]
+            del self.__order[item]
+            self.__shown.pop(item, None)
+
+    def _get_sorted_tokens(self) -> List[str]:
+        if self.__sorted_tokens_stale:
+            self.__sorted_tokens = sorted(self.__postings)
+        elif self.__unsorted_tokens:
+            # Sorting a sorted run followed by the new tokens merges them in linear time
+            self.__sorted_tokens.extend(self.__unsorted_tokens)
+            self.__sorted_tokens.sort()
+        self.__unsorted_tokens = list()
+        self.__sorted_tokens_stale = False
+        return self.__sorted_tokens
+
+    def _get_blob(self) -> str:
+        if self.__n_blob_removed > len(self.__postings):
+            self.__blob = self._token_seperator + self._token_seperator.join(self.__postings) + self._token_seperator
+            self.__n_blob_removed = 0
+        elif self.__unjoined_tokens:
+            self.__blob += self._token_seperator.join(self.__unjoined_tokens) + self._token_seperator
+        self.__unjoined_tokens = list()
+        return self.__blob
+
+    def _match_prefix(self, query: str) -> Iterator[str]:
+        tokens = self._get_sorted_tokens()
+        start = bisect_left(tokens, query)
+        end = bisect_left(tokens, query + '\U0010ffff', lo=start)
+        # Not a slice, a search stopped at max_matches would copy every matched token first
+        return (tokens[i] for i in range(start, end))
+
+    def _match_substring(self, query: str) -> Iterator[str]:
+        blob = self._get_blob()
+        postings = self.__postings
+        matched = set()
+        position = blob.find(query)
+        while position != -1:
+            start = blob.rfind(self._token_seperator, 0, position) + 1
+            end = blob.find(self._token_seperator, position)
+            token = blob[start:end]
+            # The blob may still hold removed tokens, and tokens added again after their removal twice
+            if token in postings and token not in matched:
+                matched.add(token)
+                yield token
+            position = blob.find(query, end)
+
+    def search(self,
+               query: str,
+               mode: Optional[Literal['substring', 'prefix']] = 'substring',
+               max_matches: Optional[int] = None) -> Set[str]:
+        '''Returns iids of items whose path segment or value matches the query, case insensitive.
+
+        :param query: Text to search for.
+        :type query: str
+
+        :param mode: Match tokens containing the query or starting with the query.
+        :type mode: Literal['substring', 'prefix'], optional, defaults to 'substring'
+
+        :param max_matches: Return at most this many items, so a query matching most of a large tree
+                            returns quickly. If None, return every match.
+        :type max_matches: int, optional, defaults to None
+
+        :rtype: set
+        :return: Matched iids
+
+        '''
+        query = self._normalize(query)
+        self.is_search_truncated = False
+        if not query:
+            return set(self.__parent)
+        if mode == 'prefix':
+            tokens = self._match_prefix(query)
+        else:
+            tokens = self._match_substring(query)
+        matched = set()
+        for token in tokens:
+            postings = self.__postings[token]
+            if max_matches is None or len(matched) + len(postings) < max_matches:
+                matched.update(postings)
+                continue
+            # A common token, e.g. 'true', may hold most of the items, only the first ones are taken
+            for iid in postings:
+                matched.add(iid)
+                if len(matched) >= max_matches:
+                    break
+            self.is_search_truncated = True
+            break
+        return matched
+
+    def _get_visible_children(self, matched: Set[str]) -> Dict[str, Set[str]]:
+        # Mark the ancestors of every match, stopping at the first ancestor marked by an earlier match
+        visible_children = dict()
+        parents = self.__parent
+        for iid in matched:
+            child = iid
+            parent = parents[child]
+            while True:
+                children = visible_children.get(parent)
+                if children is not None:
+                    children.add(child)
+                    break
+                visible_children[parent] = {child}
+                if parent == '':
+                    break
+                child = parent
+                parent = parents[child]
+        return visible_children
+
+    def _is_covered(self,
+                    iid: str,
+                    matched: Set[str],
+                    covered: Dict[str, bool]) -> bool:
+        # Whether the item or one of its ancestors is matched, so its whole subtree is shown
+        path = list()
+        while iid not in covered:
+            if iid == '' or iid in matched:
+                covered[iid] = iid != ''
+                break
+            path.append(iid)
+            iid = self.__parent[iid]
+        is_covered = covered[iid]
+        for item in path:
+            covered[item] = is_covered
+        return is_covered
+
+    def _get_visible(self, matched: Set[str]) -> Set[str]:
+        visible = set(self._get_visible_children(matched))
+        visible.discard('')
+        for iid in matched:
+            visible.update(self.iter_subtree(iid))
+        return visible
+
+    def filter(self,
+               query: str,
+               mode: Optional[Literal['substring', 'prefix']] = 'substring',
+               iids: Optional[Set[str]] = None,
+               max_matches: Optional[int] = None) -> Dict[str, List[str]]:
+        '''Returns the children lists to change so that only matched items,
+        their ancestors and their descendants are shown. An empty query shows every item.
+        If iids is given, only the items that are also under or above one of iids are shown.
+
+        Only shown parents whose visible children differ from what the tree currently shows are returned,
+        so the tree can be updated by detaching and reattaching items instead of rebuilding it.
+        The subtree of a match is shown by leaving its children lists alone, so the cost
+        depends on the number of matches and not on the size of their subtrees.
+
+        :param query: Text to search for.
+        :type query: str
+
+        :param mode: Match tokens containing the query or starting with the query.
+        :type mode: Literal['substring', 'prefix'], optional, defaults to 'substring'
+
+        :param iids: Items to restrict the view to.
+        :type iids: set, optional, defaults to None
+
+        :param max_matches: Show at most this many matched items, see search.
+        :type max_matches: int, optional, defaults to None
+
+        :rtype: dict
+        :return: {parent iid: visible child iids in original order}
+
+        '''
+        matched = None
+        covering = None
+        if query:
+            matched = self.search(query, mode=mode, max_matches=max_matches)
+        if iids is not None:
+            iids = {iid for iid in iids if iid in self.__parent}
+            if matched is None:
+                matched = iids
+            else:
+                # Items shown for both, the view of iids (edited or non default items) is the smaller one
+                query_visible_children = self._get_visible_children(matched)
+                query_covered = dict()
+                matched = {iid for iid in self._get_visible(iids)
+                           if iid in query_visible_children or self._is_covered(iid, matched, query_covered)}
+                # Every shown item is in matched now, no subtree is shown as a whole
+                covering = set()
+
+        if matched is None:
+            parents = list(self.__shown)
+        else:
+            visible_children = self._get_visible_children(matched)
+            visible_children.setdefault('', set())
+            covered = dict()
+            if covering is None:
+                covering = matched
+            else:
+                # A shown item none of whose children are shown is emptied too
+                for iid in matched:
+                    if iid in self.__children:
+                        visible_children.setdefault(iid, set())
+            # Hidden parents keep whatever children they had, they are refreshed once they are shown again
+            parents = list(visible_children)
+            parents.extend(parent for parent in self.__shown
+                           if parent not in visible_children and self._is_covered(parent, covering, covered))
+
+        order = self.__order
+        changed_children = dict()
+        for parent in parents:
+            all_children = self.__children.get(parent, dict())
+            if matched is None or self._is_covered(parent, covering, covered):
+                children = list(all_children)
+            else:
+                visible = visible_children[parent]
+                if len(visible) * 8 < len(all_children):
+                    children = sorted(visible, key=order.__getitem__)
+                else:
+                    children = [child for child in all_children if child in visible]
+
+            shown = self.__shown.get(parent)
+            if shown is None:
+                is_changed = len(children) != len(all_children)
+            else:
+                is_changed = shown != children
+            if is_changed:
+                changed_children[parent] = children
+
+            if len(children) == len(all_children):
+                self.__shown.pop(parent, None)
+            else:
+                self.__shown[parent] = children
+        return changed_children
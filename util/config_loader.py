@@ -1,12 +1,73 @@
 import os
 import copy
+import hashlib
 from collections import OrderedDict
-from collections.abc import Mapping
-from typing import Optional, Literal, List
-from glob import glob
+from collections.abc import Mapping, Iterator
+from typing import Optional, Literal, Dict, List, TYPE_CHECKING
 
-import yaml
-from yaml.loader import SafeLoader
+from util.config_discovery import ConfigDiscovery
+from util.config_formats import get_format
+from util.instrumentation import span
+
+if TYPE_CHECKING:
+    from util.config_schema import ConfigSchema
+
+
+class LazyConfigMapping(Mapping):
+    '''LazyConfigMapping
+
+    Read-only mapping of configuration key to configuration dictionary returned by load_files().
+    Keys come from discovery, a file is only read and parsed on the first access to its key and memoized.
+
+    :param config_loader: Loader which reads each file.
+    :type config_loader: BaseConfigLoader
+
+    :param max_cached: Maximum number of parsed files to keep, the least recently used one is
+                       dropped and parsed again on its next access. If None, keep every parsed file.
+    :type max_cached: int, optional, defaults to None
+
+    '''
+    def __init__(self,
+                 config_loader: 'BaseConfigLoader',
+                 max_cached: Optional[int] = None):
+        self.config_loader = config_loader
+        self.max_cached = max_cached
+        self.__cache = OrderedDict()
+
+    def __getitem__(self, key: str) -> dict:
+        cache = self.__cache
+        if key in cache:
+            if self.max_cached is not None:
+                cache.move_to_end(key)
+            return cache[key]
+        config_file_name = self.config_loader.config_file_names_by_key[key]
+        config_dict = self.config_loader._load_file(config_file_name)
+        cache[key] = config_dict
+        if self.max_cached is not None and len(cache) > self.max_cached:
+            cache.popitem(last=False)
+        return config_dict
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.config_loader.config_file_names_by_key)
+
+    def __len__(self) -> int:
+        return len(self.config_loader.config_file_names_by_key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.config_loader.config_file_names_by_key
+
+    def is_loaded(self, key: str) -> bool:
+        '''Returns whether the file of key is parsed and cached.
+        '''
+        return key in self.__cache
+
+    def clear_cache(self):
+        '''Drop every parsed file, each one is parsed again on its next access.
+        '''
+        self.__cache.clear()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)}, loaded={list(self.__cache)})'
 
 
 class BaseConfigLoader:
@@ -15,17 +76,27 @@ class BaseConfigLoader:
     :param config_dir: Directory that contains configuration file(s).
     :type config_dir: str
 
-    :param config_file_names: List of configuration file(s) to be read.
-                              If None, read all configuration files.
+    :param config_file_names: List of configuration file(s) to be read, relative to config_dir.
+                              If None, read all configuration files found by discovery.
     :type config_file_names: list, optional, defaults to None
 
+    :param discovery: Discovery of configuration files, e.g. ConfigDiscovery(recursive=True, exclude=('archive',)).
+                      If None, discover YAML files directly in config_dir.
+    :type discovery: ConfigDiscovery, optional, defaults to None
+
     '''
     def __init__(self,
                  config_dir: str,
-                 config_file_names: Optional[List[str]] = None):
+                 config_file_names: Optional[List[str]] = None,
+                 discovery: Optional[ConfigDiscovery] = None):
         self.config_dir = config_dir
+        self.discovery = ConfigDiscovery() if discovery is None else discovery
+        self.config_file_hashes = dict()
+        self.config_file_stats: Dict[str, os.stat_result] = dict()
+        self.__discovered = config_file_names is None
         self.config_file_names = self._init_config_file_names(config_dir=config_dir,
                                                               config_file_names=config_file_names)
+        self.config_file_names_by_key: Dict[str, str] = self._get_config_file_names_by_key(self.config_file_names)
 
     @staticmethod
     def deep_update(source: dict,
@@ -55,16 +126,85 @@ class BaseConfigLoader:
                                 config_dir: str,
                                 config_file_names: list) -> list:
         if config_file_names is None:
-            config_file_names = list()
-            config_path_list = glob(config_dir + '*.yaml')
-            for config_path in config_path_list:
-                config_file_names.append(config_path.split(os.sep)[-1])
+            with span('BaseConfigLoader._init_config_file_names', config_dir):
+                config_file_names = self.discovery.discover(config_dir)
+                # Stat results of discovery are the baseline of get_changed_files
+                for config_file_name, file_stat in self.discovery.stats.items():
+                    self.config_file_stats[os.path.join(config_dir, config_file_name)] = file_stat
         return config_file_names
 
+    @staticmethod
+    def _get_config_key(config_file_name: str) -> str:
+        '''Returns the key of a configuration file, its relative path without extension, e.g. 'nested/EXAMPLE_1'.
+        '''
+        dir_name, file_name = os.path.split(config_file_name)
+        key = file_name.split('.')[0]
+        if dir_name:
+            key = f'{dir_name.replace(os.sep, "/")}/{key}'
+        return key
+
+    @classmethod
+    def _get_config_file_names_by_key(cls,
+                                      config_file_names: List[str]) -> Dict[str, str]:
+        '''Returns {key: configuration file name}.
+        Raises ValueError if two files have the same key, e.g. 'EXAMPLE_1.yaml' and 'EXAMPLE_1.json'.
+        '''
+        config_file_names_by_key = dict()
+        for config_file_name in config_file_names:
+            key = cls._get_config_key(config_file_name)
+            if key in config_file_names_by_key:
+                raise ValueError(f'{config_file_names_by_key[key]} and {config_file_name} have the same key {key!r}, '
+                                 f'remove one of them or exclude it from discovery')
+            config_file_names_by_key[key] = config_file_name
+        return config_file_names_by_key
+
+    def get_changed_files(self) -> Dict[str, List[str]]:
+        '''Returns configuration files changed on disk since they were discovered or read.
+
+        Files are compared by the size and mtime of their stat results. Added files are only
+        reported when config_file_names was discovered, unchanged directories are not listed again.
+
+        :rtype: dict
+        :return: {'added': [...], 'removed': [...], 'modified': [...]} of configuration file names
+
+        '''
+        changed = {'added': list(), 'removed': list(), 'modified': list()}
+        if self.__discovered:
+            self.discovery.discover(self.config_dir)
+            current_stats = {os.path.join(self.config_dir, config_file_name): file_stat
+                             for config_file_name, file_stat in self.discovery.stats.items()}
+            config_file_names = set(self.config_file_names)
+            changed['added'] = [config_file_name for config_file_name in self.discovery.stats
+                                if config_file_name not in config_file_names]
+        else:
+            current_stats = dict()
+            for config_file_name in self.config_file_names:
+                file_path = os.path.join(self.config_dir, config_file_name)
+                try:
+                    current_stats[file_path] = os.stat(file_path)
+                except OSError:
+                    pass
+
+        for config_file_name in self.config_file_names:
+            file_path = os.path.join(self.config_dir, config_file_name)
+            current = current_stats.get(file_path)
+            recorded = self.config_file_stats.get(file_path)
+            if current is None:
+                changed['removed'].append(config_file_name)
+            elif recorded is None or (recorded.st_mtime_ns, recorded.st_size) != (current.st_mtime_ns, current.st_size):
+                changed['modified'].append(config_file_name)
+        return changed
+
     def _read_config(self,
                      file_path: str) -> dict:
-        with open(file_path) as f:
-            config_dict = yaml.load(f, Loader=SafeLoader)
+        with span('BaseConfigLoader._read_config.read', file_path):
+            with open(file_path, 'rb') as f:
+                if file_path not in self.config_file_stats:
+                    self.config_file_stats[file_path] = os.fstat(f.fileno())
+                data = f.read()
+            self.config_file_hashes[file_path] = hashlib.sha1(data).hexdigest()
+        with span('BaseConfigLoader._read_config.parse', file_path):
+            config_dict = get_format(file_path).loads(data)
 
         return config_dict
 
@@ -76,13 +216,16 @@ class BaseConfigLoader:
 
         '''
         config_dicts = dict()
-        for config_file_name in self.config_file_names:
-            self.config_file_path = os.path.join(self.config_dir,
-                                                 config_file_name)
-            config_dict = self._read_config(self.config_file_path)
-            config_dicts[config_file_name.split('.')[0]] = config_dict
+        for config_key, config_file_name in self.config_file_names_by_key.items():
+            config_dicts[config_key] = self._load_file(config_file_name)
         return config_dicts
 
+    def _load_file(self,
+                   config_file_name: str) -> dict:
+        self.config_file_path = os.path.join(self.config_dir,
+                                             config_file_name)
+        return self._read_config(self.config_file_path)
+
     def load(self) -> dict:
         '''Returns loaded configuration dictionary
 
@@ -92,6 +235,20 @@ class BaseConfigLoader:
         '''
         return self._load()
 
+    def load_files(self,
+                   max_cached: Optional[int] = None) -> LazyConfigMapping:
+        '''Returns the configuration of every file keyed by configuration key, each file is only parsed on its first access.
+        Unlike ConfigLoader.load, the files are not merged.
+
+        :param max_cached: Maximum number of parsed files kept by the mapping, see LazyConfigMapping.
+        :type max_cached: int, optional, defaults to None
+
+        :rtype: LazyConfigMapping
+        :return: {configuration key: configuration dictionary of one file}
+
+        '''
+        return LazyConfigMapping(self, max_cached=max_cached)
+
 
 class ConfigMelter:
     '''ConfigMelter
@@ -111,9 +268,10 @@ class ConfigMelter:
         :return: Unnested structure of input data_dict
 
         '''
-        data_dict = copy.deepcopy(data_dict)
-        self.__result = list()
-        self._recursively_melt(data_dict)
+        with span('ConfigMelter.melt'):
+            data_dict = copy.deepcopy(data_dict)
+            self.__result = list()
+            self._recursively_melt(data_dict)
         return self.__result
 
     def _recursively_melt(self,
@@ -160,25 +318,117 @@ class ConfigLoader(BaseConfigLoader):
                               If None, read all configuration files.
     :type config_file_names: list, optional, defaults to None
 
+    :param discovery: Discovery of configuration files, see BaseConfigLoader.
+    :type discovery: ConfigDiscovery, optional, defaults to None
+
+    :param schema: Schema to validate the configuration of each file after merging INDEP_ENV and DEP_ENV,
+                   see util.config_schema.ConfigSchema. Files which have passed before with the same content are not validated again.
+                   Loading raises ValueError if none of the top-level keys of the merged configuration are in the schema,
+                   e.g. with a schema inferred by ConfigSchema.from_dir without running_env.
+    :type schema: ConfigSchema, optional, defaults to None
+
     '''
     def __init__(self,
                  config_dir: str,
                  running_env: Optional[Literal['DEV', 'NON_PROD', 'PROD']] = 'DEV',
-                 config_file_names: Optional[List[str]] = None):
+                 config_file_names: Optional[List[str]] = None,
+                 discovery: Optional[ConfigDiscovery] = None,
+                 schema: Optional['ConfigSchema'] = None):
 
         super().__init__(config_dir=config_dir,
-                         config_file_names=config_file_names)
+                         config_file_names=config_file_names,
+                         discovery=discovery)
         self.running_env = running_env.upper()
+        self.schema = schema
 
     def __merge_indep_and_dep(self,
                               config_dict: dict) -> dict:
         processed_config_dict = dict()
-        indep_config_dict = config_dict.get('INDEP_ENV', dict())
-        dep_config_dict = config_dict.get('DEP_ENV', dict()).get(self.running_env, dict())
+        if not config_dict:
+            # An empty file, None in YAML and JSON
+            return processed_config_dict
+        indep_config_dict = config_dict.get('INDEP_ENV') or dict()
+        dep_config_dict = (config_dict.get('DEP_ENV') or dict()).get(self.running_env) or dict()
         processed_config_dict = self.deep_update(processed_config_dict, indep_config_dict)
         processed_config_dict = self.deep_update(processed_config_dict, dep_config_dict)
         return processed_config_dict
 
+    @staticmethod
+    def overlay(source: dict,
+                overrides: dict,
+                copy_source: Optional[bool] = True) -> dict:
+        '''Returns source updated with overrides like deep_update, without modifying source.
+
+        Only the dictionaries along the overridden paths are copied, every other value is shared
+        with source and overrides, so the result must not be modified in place.
+
+        :param source: Dictionary to be updated.
+        :type source: dict
+
+        :param overrides: Dictionary which contains updated values.
+        :type overrides: dict
+
+        :param copy_source: If False, update the top level of source in place, for a dictionary owned by the caller.
+        :type copy_source: bool, optional, defaults to True
+
+        '''
+        result = dict(source) if copy_source else source
+        for key, value in overrides.items():
+            if isinstance(value, Mapping) and value and isinstance(result.get(key), Mapping):
+                result[key] = ConfigLoader.overlay(result[key], value)
+            else:
+                result[key] = value
+        return result
+
+    def load_all_envs(self,
+                      envs: Optional[List[str]] = None) -> Dict[str, dict]:
+        '''Returns the configuration of every environment, like load() with each one as running_env.
+
+        Each file is read and parsed once. The DEP_ENV of each environment is overlaid on the shared INDEP_ENV,
+        which copies only the dictionaries along the overridden paths, so the configurations share every
+        value that no environment overrides and must be treated as read-only (copy.deepcopy one to edit it).
+
+        :param envs: Environments to load. If None, every environment under DEP_ENV of any file,
+                     in the order they first appear, or only running_env if no file has DEP_ENV.
+        :type envs: list, optional, defaults to None
+
+        :rtype: dict
+        :return: {environment: configuration dictionary}
+
+        '''
+        file_configs = list()
+        discovered_envs = dict()
+        for config_file_name in self.config_file_names:
+            config_dict = BaseConfigLoader._load_file(self, config_file_name) or dict()
+            dep_config_dicts = config_dict.get('DEP_ENV') or dict()
+            discovered_envs.update(dict.fromkeys(dep_config_dicts))
+            file_configs.append((self.config_file_path,
+                                 config_dict.get('INDEP_ENV') or dict(),
+                                 dep_config_dicts))
+        if envs is None:
+            envs = list(discovered_envs) or [self.running_env]
+
+        all_env_config_dicts = dict()
+        for env in envs:
+            all_processed_config_dicts = dict()
+            for file_path, indep_config_dict, dep_config_dicts in file_configs:
+                with span('ConfigLoader.load_all_envs.overlay', file_path):
+                    dep_config_dict = dep_config_dicts.get(env)
+                    processed_config_dict = self.overlay(indep_config_dict, dep_config_dict) if dep_config_dict else indep_config_dict
+                if self.schema is not None:
+                    self.schema.check(processed_config_dict,
+                                      cache_key=(env, self.config_file_hashes[file_path]))
+                all_processed_config_dicts = self.overlay(all_processed_config_dicts, processed_config_dict, copy_source=False)
+            self._check_schema_shape(all_processed_config_dicts)
+            all_env_config_dicts[env] = all_processed_config_dicts
+        return all_env_config_dicts
+
+    def _check_schema_shape(self,
+                            config_dict: dict):
+        if self.schema is not None and not self.schema.matches_shape(config_dict):
+            raise ValueError(f'None of the top-level keys of the configuration in {self.config_dir} are in the schema, '
+                             f'infer the schema of a ConfigLoader with ConfigSchema.from_dir(..., running_env=...)')
+
     def _load(self) -> dict:
         '''Returns loaded configuration dictionary
 
@@ -188,12 +438,25 @@ class ConfigLoader(BaseConfigLoader):
         '''
         all_processed_config_dicts = dict()
         for config_file_name in self.config_file_names:
-            self.config_file_path = os.path.join(self.config_dir, config_file_name)
-            config_dict = self._read_config(self.config_file_path)
-            config_dict = self.__merge_indep_and_dep(config_dict)
-            all_processed_config_dicts = self.deep_update(all_processed_config_dicts, config_dict)
+            config_dict = self._load_file(config_file_name)
+            with span('ConfigLoader.deep_update', self.config_file_path):
+                all_processed_config_dicts = self.deep_update(all_processed_config_dicts, config_dict)
+        self._check_schema_shape(all_processed_config_dicts)
         return all_processed_config_dicts
 
+    def _load_file(self,
+                   config_file_name: str) -> dict:
+        '''Returns the configuration of one file, INDEP_ENV merged with DEP_ENV of running_env.
+        With load_files(), each value of the mapping is the configuration of one file.
+        '''
+        config_dict = super()._load_file(config_file_name)
+        with span('ConfigLoader.__merge_indep_and_dep', self.config_file_path):
+            config_dict = self.__merge_indep_and_dep(config_dict)
+        if self.schema is not None:
+            self.schema.check(config_dict,
+                              cache_key=(self.running_env, self.config_file_hashes[self.config_file_path]))
+        return config_dict
+
 
 if __name__ == '__main__':
     # cl = BaseConfigLoader(config_dir='./config/')
@@ -0,0 +1,259 @@
+from typing import Optional, Literal, Callable, Dict, List, Tuple
+
+from util.config_loader import BaseConfigLoader, ConfigLoader
+
+
+class ConfigValidationError(ValueError):
+    '''Raised when a configuration does not match its schema.
+
+    :param errors: Validation error messages, one per invalid path.
+    :type errors: list
+
+    '''
+    def __init__(self,
+                 errors: List[str]):
+        super().__init__('\n'.join(errors))
+        self.errors = errors
+
+
+class ConfigSchema:
+    '''ConfigSchema
+
+    Schema of a configuration, compiled into one validator closure per path,
+    so a whole configuration is validated in a single pass over its values.
+
+    :param schema: Allowed type(s) of each path, {path: type or tuple of types}.
+                   Keys of a path are joined by key_seperator and '*' matches every list element,
+                   e.g. {'tutorial/*/yaml/born': int}. None allows any type.
+    :type schema: dict
+
+    :param allow_unknown: Allow paths which are not in the schema.
+    :type allow_unknown: bool, optional, defaults to True
+
+    :param key_seperator: Separator of keys in a path.
+    :type key_seperator: str, optional, defaults to '/'
+
+    :param list_key_prefix: Key prefix of list elements used by ConfigMelter and ConfigEditor.
+    :type list_key_prefix: str, optional, defaults to '-LIST-: '
+
+    '''
+    list_wildcard = '*'
+
+    def __init__(self,
+                 schema: Dict[str, Optional[Tuple[type, ...]]],
+                 allow_unknown: Optional[bool] = True,
+                 key_seperator: Optional[str] = '/',
+                 list_key_prefix: Optional[str] = '-LIST-: '):
+        self.schema = schema
+        self.allow_unknown = allow_unknown
+        self.key_seperator = key_seperator
+        self.list_key_prefix = list_key_prefix
+        self.validators: Dict[str, Callable] = {path: self._compile(types) for path, types in schema.items()}
+        self.__container_paths = set()
+        for path in self.validators:
+            keys = path.split(self.key_seperator)
+            for i in range(len(keys)):
+                self.__container_paths.add(self.key_seperator.join(keys[:i]))
+        self.__valid_cache_keys = set()
+
+    @classmethod
+    def from_config(cls,
+                    config: dict,
+                    **kwargs) -> 'ConfigSchema':
+        '''Returns a schema inferred from the types of a configuration, e.g. a default configuration.
+
+        Types of all elements of a list are merged into one '*' path.
+        A path with a None value allows any type, a float path also allows int.
+
+        :param config: Configuration to infer the schema from.
+        :type config: dict
+
+        :rtype: ConfigSchema
+        :return: Inferred schema
+
+        '''
+        key_seperator = kwargs.get('key_seperator', '/')
+        schema = dict()
+        stack = [(None, config)]
+        while stack:
+            path, value = stack.pop()
+            if path is not None:
+                if value is None:
+                    types = None
+                elif isinstance(value, float):
+                    types = (float, int)
+                else:
+                    types = (type(value),)
+                if path not in schema:
+                    schema[path] = types
+                elif schema[path] is not None:
+                    schema[path] = None if types is None else tuple(dict.fromkeys(schema[path] + types))
+
+            prefix = '' if path is None else path + key_seperator
+            if isinstance(value, dict):
+                for key, item in value.items():
+                    stack.append((f'{prefix}{key}', item))
+            elif isinstance(value, list):
+                for item in value:
+                    stack.append((f'{prefix}{cls.list_wildcard}', item))
+        return cls(schema, **kwargs)
+
+    @classmethod
+    def from_dir(cls,
+                 config_dir: str,
+                 running_env: Optional[Literal['DEV', 'NON_PROD', 'PROD']] = None,
+                 config_file_names: Optional[List[str]] = None,
+                 **kwargs) -> 'ConfigSchema':
+        '''Returns a schema inferred from the configuration files in a directory, e.g. default_config_dir.
+
+        :param config_dir: Directory that contains configuration file(s).
+        :type config_dir: str
+
+        :param running_env: If given, infer from the configuration merged by ConfigLoader for this environment,
+                            the schema to pass to ConfigLoader. Otherwise from the configuration of every file
+                            keyed by file name as BaseConfigLoader, the schema of ConfigEditor.
+        :type running_env: Literal['DEV', 'NON_PROD', 'PROD'], optional, defaults to None
+
+        :param config_file_names: List of configuration file(s) to be read.
+                                  If None, read all configuration files.
+        :type config_file_names: list, optional, defaults to None
+
+        :rtype: ConfigSchema
+        :return: Inferred schema
+
+        '''
+        if running_env is None:
+            config = BaseConfigLoader(config_dir=config_dir,
+                                      config_file_names=config_file_names).load()
+        else:
+            config = ConfigLoader(config_dir=config_dir,
+                                  running_env=running_env,
+                                  config_file_names=config_file_names).load()
+        if not config:
+            # A schema without any path would accept every configuration
+            raise ValueError(f'No configuration to infer a schema from in {config_dir}'
+                             + ('' if running_env is None else f' for {running_env}, the files may have no INDEP_ENV or DEP_ENV'))
+        return cls.from_config(config, **kwargs)
+
+    @staticmethod
+    def _accept_any(value) -> Optional[str]:
+        return None
+
+    def _compile(self, types) -> Callable:
+        if types is None:
+            return self._accept_any
+        if isinstance(types, type):
+            types = (types,)
+        types = tuple(types)
+        type_names = ' or '.join(t.__name__ for t in types)
+        accept_bool = bool in types
+
+        def validate(value) -> Optional[str]:
+            value_type = type(value)
+            if value_type in types:
+                return None
+            # bool is a subclass of int, but an int path does not accept True or False
+            if isinstance(value, types) and (accept_bool or value_type is not bool):
+                return None
+            return f'expected {type_names}, got {value_type.__name__}'
+        return validate
+
+    def get_schema_path(self,
+                        keys: List[str]) -> str:
+        '''Returns the schema path of keys, list element keys such as '-LIST-: 0' become '*'.
+        '''
+        return self.key_seperator.join(self.list_wildcard if str(key).startswith(self.list_key_prefix) else str(key)
+                                       for key in keys)
+
+    def matches_shape(self,
+                      config: dict) -> bool:
+        '''Returns whether a top-level key of a non empty configuration is in the schema.
+        False means the schema describes another shape, e.g. configurations keyed by file name
+        inferred by from_dir without running_env, which would validate nothing of config.
+        '''
+        return not config or any(str(key) in self.validators for key in config)
+
+    def validate_value(self,
+                       keys: List[str],
+                       value) -> Optional[str]:
+        '''Returns the error message of a single value at keys, None if it is valid or its path is unknown.
+        '''
+        validator = self.validators.get(self.get_schema_path(keys))
+        if validator is None:
+            return 'unknown key' if not self.allow_unknown else None
+        return validator(value)
+
+    def _validate(self,
+                  value,
+                  schema_path: str,
+                  path: str,
+                  errors: List[str]):
+        validator = self.validators.get(schema_path)
+        if validator is None:
+            if not self.allow_unknown:
+                errors.append(f'{path}: unknown key')
+            return
+        error = validator(value)
+        if error is not None:
+            errors.append(f'{path}: {error}')
+            return
+        if schema_path not in self.__container_paths:
+            return
+
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self._validate(item,
+                               f'{schema_path}{self.key_seperator}{key}',
+                               f'{path}{self.key_seperator}{key}',
+                               errors)
+        elif isinstance(value, list):
+            item_schema_path = f'{schema_path}{self.key_seperator}{self.list_wildcard}'
+            for i, item in enumerate(value):
+                self._validate(item,
+                               item_schema_path,
+                               f'{path}{self.key_seperator}{self.list_key_prefix}{i}',
+                               errors)
+
+    def validate(self,
+                 config: dict,
+                 keys: Optional[List[str]] = None) -> List[str]:
+        '''Returns validation error messages of a configuration, an empty list if it is valid.
+
+        :param config: Configuration, or the value at keys.
+        :type config: dict
+
+        :param keys: Keys of the value to validate, for a value inside a configuration.
+        :type keys: list, optional, defaults to None
+
+        :rtype: list
+        :return: Validation error messages
+
+        '''
+        errors = list()
+        if keys:
+            self._validate(config, self.get_schema_path(keys), self.key_seperator.join(str(key) for key in keys), errors)
+        elif isinstance(config, dict):
+            for key, item in config.items():
+                self._validate(item, str(key), str(key), errors)
+        return errors
+
+    def check(self,
+              config: dict,
+              cache_key: Optional[object] = None):
+        '''Raise ConfigValidationError if a configuration is invalid.
+
+        :param config: Configuration to validate.
+        :type config: dict
+
+        :param cache_key: Key identifying the configuration content, e.g. its file hash.
+                          A configuration with a cache key which has passed before is not validated again.
+        :type cache_key: object, optional, defaults to None
+
+        '''
+        if cache_key is not None and cache_key in self.__valid_cache_keys:
+            return
+        errors = self.validate(config)
+        if errors:
+            raise ConfigValidationError(errors)
+        if cache_key is not None:
+            self.__valid_cache_keys.add(cache_key)
@@ -0,0 +1,566 @@
+import os
+import sys
+import time
+import stat
+import socket
+import hashlib
+import argparse
+import threading
+import http.client
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Literal, Dict, List, TYPE_CHECKING
+
+from util.config_diff import ConfigDiff
+from util.config_discovery import ConfigDiscovery
+from util.config_formats import get_patterns
+from util.config_formats import get_formats
+from util.config_loader import ConfigLoader
+from util.instrumentation import span
+
+if TYPE_CHECKING:
+    from util.config_schema import ConfigSchema
+
+
+# Delta encoding of RFC 3229, a client sends 'A-IM: config-delta' and gets '226 IM Used' with a delta body
+DELTA_IM = 'config-delta'
+
+
+def _sort_key(key: object,
+              list_key_prefix: str) -> tuple:
+    # List elements in index order, '-LIST-: 10' after '-LIST-: 9'
+    if isinstance(key, str) and key.startswith(list_key_prefix):
+        index = key[len(list_key_prefix):]
+        # A dictionary key may start with the prefix too, e.g. '-LIST-: x'
+        if index.isdecimal():
+            return (0, int(index), '')
+    return (1, 0, str(key))
+
+
+def make_delta(source: dict,
+               target: dict,
+               list_key_prefix: Optional[str] = '-LIST-: ') -> Dict[str, list]:
+    '''Returns the path level operations which turn source into target, see apply_delta.
+
+    :param source: Configuration to compare from.
+    :type source: dict
+
+    :param target: Configuration to compare to.
+    :type target: dict
+
+    :param list_key_prefix: Key prefix of list elements in paths.
+    :type list_key_prefix: str, optional, defaults to '-LIST-: '
+
+    :rtype: dict
+    :return: {'delete': [path], 'set': [[path, value]]}, deletes in descending and sets in ascending path order
+
+    '''
+    diff = ConfigDiff(source, target, list_key_prefix=list_key_prefix)
+
+    def sort_key(path):
+        return [_sort_key(key, list_key_prefix) for key in path]
+
+    return {'delete': [list(path) for path in sorted(diff.removed, key=sort_key, reverse=True)],
+            'set': [[list(path), diff.get_value(target, path)] for path in sorted(diff.added | diff.changed, key=sort_key)]}
+
+
+def apply_delta(config: dict,
+                delta: Dict[str, list],
+                list_key_prefix: Optional[str] = '-LIST-: ') -> dict:
+    '''Returns config with the operations of make_delta applied, without modifying config.
+    Only the dictionaries and lists along the paths of the operations are copied, every other value is shared.
+
+    :param config: Configuration the delta was made from.
+    :type config: dict
+
+    :param delta: {'delete': [path], 'set': [[path, value]]}
+    :type delta: dict
+
+    :param list_key_prefix: Key prefix of list elements in paths.
+    :type list_key_prefix: str, optional, defaults to '-LIST-: '
+
+    :rtype: dict
+    :return: Configuration the delta was made to
+
+    '''
+    result = dict(config)
+    copied = {id(result)}
+
+    def to_key(container, key):
+        if isinstance(container, list):
+            return int(key[len(list_key_prefix):])
+        return key
+
+    def get_parent(path):
+        parent = result
+        for key in path[:-1]:
+            key = to_key(parent, key)
+            child = parent[key]
+            if id(child) not in copied:
+                child = list(child) if isinstance(child, list) else dict(child)
+                copied.add(id(child))
+                parent[key] = child
+            parent = child
+        return parent, to_key(parent, path[-1])
+
+    for path in delta.get('delete', ()):
+        parent, key = get_parent(path)
+        del parent[key]
+    for path, value in delta.get('set', ()):
+        parent, key = get_parent(path)
+        if isinstance(parent, list) and key == len(parent):
+            parent.append(value)
+        else:
+            parent[key] = value
+    return result
+
+
+class ConfigSnapshot:
+    '''One published version of the merged configuration.
+    The ETag is the hash of the serialized configuration, so it is stable across server restarts.
+    '''
+    __slots__ = ('version', 'etag', 'config', 'body', 'created')
+
+    def __init__(self,
+                 version: int,
+                 etag: str,
+                 config: dict,
+                 body: bytes):
+        self.version = version
+        self.etag = etag
+        self.config = config
+        self.body = body
+        self.created = time.time()
+
+
+class _ConfigRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # client_address is an empty string on a UNIX socket
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self,
+              status: int,
+              body: bytes = b'',
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        config_server: ConfigServer = self.server.config_server
+        snapshot = config_server.snapshot
+        if self.path == '/status':
+            self._send(200, config_server.json_format.dumps(config_server.status()))
+            return
+        if self.path != '/config':
+            self._send(404, b'{}')
+            return
+
+        headers = {'ETag': snapshot.etag, 'X-Config-Version': str(snapshot.version)}
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match == snapshot.etag:
+            self._send(304, headers=headers)
+            return
+        if if_none_match is not None and DELTA_IM in self.headers.get('A-IM', ''):
+            body = config_server.get_delta_body(if_none_match, snapshot)
+            if body is not None:
+                headers['IM'] = DELTA_IM
+                headers['Delta-Base'] = if_none_match
+                self._send(226, body, headers=headers)
+                return
+        self._send(200, snapshot.body, headers=headers)
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ConfigServer:
+    '''ConfigServer
+
+    Serve the merged configuration of one ConfigLoader to the processes of a host,
+    over localhost HTTP or a UNIX socket, so each configuration file is parsed once per host.
+
+    A watcher thread polls get_changed_files, re-parses only the added and modified files and publishes
+    a new versioned snapshot when the merged configuration changed. If a file fails to parse or to validate,
+    the previous snapshot is kept and the error is reported by GET /status.
+
+    - GET /config: The configuration as JSON with an ETag. With 'If-None-Match' of the current ETag,
+      '304 Not Modified'. With 'If-None-Match' of a recent ETag and 'A-IM: config-delta', '226 IM Used'
+      with the path level delta of make_delta.
+    - GET /status: Version, ETag, configuration files and the last error.
+
+    :param config_dir: Directory that contains configuration file(s).
+    :type config_dir: str
+
+    :param running_env: Running environment.
+    :type running_env: Literal['DEV', 'NON_PROD', 'PROD'], optional, defaults to 'DEV'
+
+    :param discovery: Discovery of configuration files, see BaseConfigLoader.
+    :type discovery: ConfigDiscovery, optional, defaults to None
+
+    :param schema: Schema to validate the configuration of each file, see ConfigLoader.
+    :type schema: ConfigSchema, optional, defaults to None
+
+    :param socket_path: Path of the UNIX socket to listen on. If None, listen on host and port.
+    :type socket_path: str, optional, defaults to None
+
+    :param host: Host to listen on, keep it local.
+    :type host: str, optional, defaults to '127.0.0.1'
+
+    :param port: Port to listen on, 0 picks a free port.
+    :type port: int, optional, defaults to 0
+
+    :param poll_interval: Seconds between checks for changed files.
+    :type poll_interval: float, optional, defaults to 1.0
+
+    :param max_history: Number of previous snapshots a delta can be made from.
+    :type max_history: int, optional, defaults to 16
+
+    '''
+    def __init__(self,
+                 config_dir: str,
+                 running_env: Optional[Literal['DEV', 'NON_PROD', 'PROD']] = 'DEV',
+                 discovery: Optional[ConfigDiscovery] = None,
+                 schema: Optional['ConfigSchema'] = None,
+                 socket_path: Optional[str] = None,
+                 host: Optional[str] = '127.0.0.1',
+                 port: Optional[int] = 0,
+                 poll_interval: Optional[float] = 1.0,
+                 max_history: Optional[int] = 16):
+        self.config_dir = config_dir
+        self.running_env = running_env
+        self.discovery = ConfigDiscovery() if discovery is None else discovery
+        self.schema = schema
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.max_history = max_history
+        self.json_format = get_formats(available=False)['json']
+        self.config_loader: Optional[ConfigLoader] = None
+        self.snapshot: Optional[ConfigSnapshot] = None
+        self.last_error: Optional[str] = None
+        self.__file_configs: Dict[str, dict] = dict()
+        self.__history: Dict[str, ConfigSnapshot] = OrderedDict()
+        self.__deltas: Dict[tuple, bytes] = dict()
+        self.__refresh_lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__threads: List[threading.Thread] = list()
+        self.__server = None
+
+    def refresh(self) -> bool:
+        '''Re-parse the changed configuration files and publish a new snapshot if the configuration changed.
+
+        :rtype: bool
+        :return: Whether a new snapshot was published
+
+        '''
+        with self.__refresh_lock, span('ConfigServer.refresh', self.config_dir):
+            if self.config_loader is None:
+                stale = None
+            else:
+                changed = self.config_loader.get_changed_files()
+                if not any(changed.values()):
+                    return False
+                stale = set(changed['modified']) | set(changed['removed'])
+
+            config_loader = ConfigLoader(config_dir=self.config_dir,
+                                         running_env=self.running_env,
+                                         discovery=self.discovery,
+                                         schema=self.schema)
+            file_configs = dict()
+            config_dict = dict()
+            for config_file_name in config_loader.config_file_names:
+                if stale is not None and config_file_name not in stale and config_file_name in self.__file_configs:
+                    file_configs[config_file_name] = self.__file_configs[config_file_name]
+                else:
+                    file_configs[config_file_name] = config_loader._load_file(config_file_name)
+                # overlay does not modify the cached configurations of the files, unlike deep_update
+                config_dict = ConfigLoader.overlay(config_dict, file_configs[config_file_name], copy_source=False)
+            self.config_loader = config_loader
+            self.__file_configs = file_configs
+            self.last_error = None
+            return self._publish(config_dict)
+
+    def _publish(self,
+                 config_dict: dict) -> bool:
+        body = self.json_format.dumps(config_dict)
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.snapshot is not None and self.snapshot.etag == etag:
+            return False
+        # Snapshots hold what clients decode, e.g. integer keys become strings, so deltas apply exactly
+        snapshot = ConfigSnapshot(version=1 if self.snapshot is None else self.snapshot.version + 1,
+                                  etag=etag,
+                                  config=self.json_format.loads(body),
+                                  body=body)
+        self.__history[etag] = snapshot
+        while len(self.__history) > self.max_history + 1:
+            self.__history.popitem(last=False)
+        self.__deltas = dict()
+        self.snapshot = snapshot
+        return True
+
+    def get_delta_body(self,
+                       etag: str,
+                       snapshot: ConfigSnapshot) -> Optional[bytes]:
+        '''Returns the serialized delta from the snapshot of etag to snapshot, None if etag is not in the history.
+        '''
+        key = (etag, snapshot.etag)
+        body = self.__deltas.get(key)
+        if body is None:
+            source = self.__history.get(etag)
+            if source is None:
+                return None
+            delta = make_delta(source.config, snapshot.config)
+            delta['version'] = snapshot.version
+            body = self.json_format.dumps(delta)
+            self.__deltas[key] = body
+        return body
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        return {'version': snapshot.version if snapshot is not None else None,
+                'etag': snapshot.etag if snapshot is not None else None,
+                'config_files': list(self.__file_configs),
+                'last_error': self.last_error}
+
+    def _watch(self):
+        while not self.__stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good snapshot until the files are fixed
+                self.last_error = f'{type(e).__name__}: {e}'
+
+    @property
+    def address(self) -> str:
+        '''Returns the UNIX socket path or the 'http://host:port' URL the server listens on.
+        '''
+        if self.socket_path is not None:
+            return self.socket_path
+        return f'http://{self.host}:{self.port}'
+
+    def _is_socket_in_use(self) -> bool:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Nobody listens on a socket left by a server which did not shut down
+            return False
+        finally:
+            probe.close()
+
+    def start(self) -> 'ConfigServer':
+        '''Load the configuration, then serve it and watch for changes in background threads.
+        '''
+        if self.snapshot is None:
+            self.refresh()
+        if self.socket_path is not None:
+            try:
+                mode = os.lstat(self.socket_path).st_mode
+            except FileNotFoundError:
+                mode = None
+            if mode is not None:
+                # Only replace the socket left by an earlier server, never another file or a running server
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f'{self.socket_path} exists and is not a socket')
+                if self._is_socket_in_use():
+                    raise FileExistsError(f'{self.socket_path} is used by a running server')
+                os.unlink(self.socket_path)
+            self.__server = _ThreadingUnixHTTPServer(self.socket_path, _ConfigRequestHandler)
+        else:
+            self.__server = ThreadingHTTPServer((self.host, self.port), _ConfigRequestHandler)
+            self.port = self.__server.server_address[1]
+        self.__server.config_server = self
+        self.__stop.clear()
+        self.__threads = [threading.Thread(target=self.__server.serve_forever, daemon=True),
+                          threading.Thread(target=self._watch, daemon=True)]
+        for thread in self.__threads:
+            thread.start()
+        return self
+
+    def shutdown(self):
+        '''Stop serving and watching.
+        '''
+        self.__stop.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = list()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self,
+                 socket_path: str,
+                 timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ConfigClient:
+    '''ConfigClient
+
+    In-process cache of the configuration served by ConfigServer.
+    get() revalidates the cached snapshot with its ETag on a kept-alive connection,
+    an unchanged configuration costs one '304 Not Modified' round trip and a changed one only its delta.
+    The returned configuration is shared with later calls, copy.deepcopy it to edit it.
+
+    :param socket_path: UNIX socket path of the server. If None, connect to host and port.
+    :type socket_path: str, optional, defaults to None
+
+    :param host: Host of the server.
+    :type host: str, optional, defaults to '127.0.0.1'
+
+    :param port: Port of the server.
+    :type port: int, optional, defaults to 8765
+
+    :param max_age: Seconds to return the cached configuration without revalidating it.
+    :type max_age: float, optional, defaults to 0.0
+
+    :param timeout: Socket timeout in seconds.
+    :type timeout: float, optional, defaults to 5.0
+
+    '''
+    def __init__(self,
+                 socket_path: Optional[str] = None,
+                 host: Optional[str] = '127.0.0.1',
+                 port: Optional[int] = 8765,
+                 max_age: Optional[float] = 0.0,
+                 timeout: Optional[float] = 5.0):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.max_age = max_age
+        self.timeout = timeout
+        self.json_format = get_formats(available=False)['json']
+        self.config: Optional[dict] = None
+        self.etag: Optional[str] = None
+        self.version: Optional[int] = None
+        self.__validated = None
+        self.__connection = None
+        self.__lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.__connection is None:
+            if self.socket_path is not None:
+                self.__connection = _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            else:
+                self.__connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self.__connection
+
+    def _request(self,
+                 path: str,
+                 headers: Dict[str, str]) -> http.client.HTTPResponse:
+        for attempt in range(2):
+            connection = self._connect()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.body = response.read()
+                return response
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the kept-alive connection, reconnect once
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def get(self) -> dict:
+        '''Returns the configuration, revalidated unless it was validated within max_age seconds.
+        '''
+        with self.__lock:
+            now = time.monotonic()
+            if self.config is not None and now - self.__validated < self.max_age:
+                return self.config
+
+            headers = dict()
+            if self.etag is not None:
+                headers['If-None-Match'] = self.etag
+                headers['A-IM'] = DELTA_IM
+            response = self._request('/config', headers)
+            if response.status == 226:
+                delta = self.json_format.loads(response.body)
+                self.config = apply_delta(self.config, delta)
+            elif response.status == 200:
+                self.config = self.json_format.loads(response.body)
+            elif response.status != 304:
+                raise ConnectionError(f'Unexpected response {response.status} {response.reason} from {self.socket_path or self.host}')
+            self.etag = response.getheader('ETag')
+            self.version = int(response.getheader('X-Config-Version'))
+            self.__validated = now
+            return self.config
+
+    def status(self) -> dict:
+        '''Returns GET /status of the server.
+        '''
+        with self.__lock:
+            return self.json_format.loads(self._request('/status', dict()).body)
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Serve the merged configuration of a directory to local processes.')
+    parser.add_argument('--config-dir', required=True, help='Directory that contains configuration file(s)')
+    parser.add_argument('--env', default='DEV', help='Running environment')
+    parser.add_argument('--recursive', action='store_true', help='Also serve files in subdirectories')
+    parser.add_argument('--all-formats', action='store_true', help='Serve files of every available format, not only YAML')
+    parser.add_argument('--socket', default=None, help='Listen on this UNIX socket instead of localhost HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between checks for changed files')
+    args = parser.parse_args(argv)
+
+    config_server = ConfigServer(config_dir=args.config_dir,
+                                 running_env=args.env,
+                                 discovery=ConfigDiscovery(include=get_patterns() if args.all_formats else ('*.yaml', '*.yml'),
+                                                           recursive=args.recursive),
+                                 socket_path=args.socket,
+                                 host=args.host,
+                                 port=args.port,
+                                 poll_interval=args.poll_interval)
+    with config_server:
+        print(f'Serving {args.config_dir} ({args.env}) on {config_server.address}', file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
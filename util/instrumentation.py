@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from typing import Optional, Dict, List, Tuple
+
+
+class _NullSpan:
+    '''Shared no-op span returned while instrumentation is disabled.
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    '''Time one block with perf_counter_ns and, if enabled, its tracemalloc peak.
+    '''
+    __slots__ = ('instrumentation', 'name', 'key', 'start_ns', 'start_memory', 'peak_memory')
+
+    def __init__(self,
+                 instrumentation: 'Instrumentation',
+                 name: str,
+                 key: Optional[str]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.key = key
+
+    def __enter__(self):
+        instrumentation = self.instrumentation
+        if instrumentation.trace_memory:
+            import tracemalloc
+            stack = instrumentation.span_stack
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # reset_peak below would lose the peak of the enclosing span
+                stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.start_memory = current
+            self.peak_memory = current
+            stack.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ns = time.perf_counter_ns() - self.start_ns
+        instrumentation = self.instrumentation
+        peak_bytes = 0
+        # Not on the stack if disable() reset it, or if memory tracing was enabled after the span was entered
+        if instrumentation.trace_memory and instrumentation.span_stack[-1:] == [self]:
+            import tracemalloc
+            stack = instrumentation.span_stack
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            peak_bytes = self.peak_memory - self.start_memory
+            stack.pop()
+            if stack:
+                stack[-1].peak_memory = max(stack[-1].peak_memory, self.peak_memory)
+        instrumentation.record(self.name, self.key, duration_ns, peak_bytes)
+        return False
+
+
+class Instrumentation:
+    '''Instrumentation
+
+    Aggregated timing and memory statistics of named spans, e.g. per configuration file.
+    While disabled, span() returns a shared no-op context manager, so instrumented code
+    only pays for one attribute check.
+
+    Set the environment variable CONFIG_INSTRUMENTATION to 'time' or 'memory' to enable it at import.
+
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        # Whether enable() started tracemalloc, tracing started by the application is left running
+        self.__started_tracemalloc = False
+        # Each thread nests its own spans
+        self.__local = threading.local()
+        self.__stats: Dict[Tuple[str, Optional[str]], list] = dict()
+
+    @property
+    def span_stack(self) -> List[Span]:
+        '''Spans of the current thread tracing memory which have not exited yet, the innermost last.
+        '''
+        stack = getattr(self.__local, 'span_stack', None)
+        if stack is None:
+            stack = self.__local.span_stack = list()
+        return stack
+
+    def enable(self,
+               trace_memory: Optional[bool] = False):
+        '''Start recording spans.
+
+        :param trace_memory: Also record the tracemalloc peak of every span, tracing memory is slow.
+        :type trace_memory: bool, optional, defaults to False
+
+        '''
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory:
+            # tracemalloc is only imported when memory is traced
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.__started_tracemalloc = True
+
+    def disable(self):
+        '''Stop recording spans, recorded statistics are kept until reset().
+        '''
+        self.enabled = False
+        if self.__started_tracemalloc:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.__started_tracemalloc = False
+        self.trace_memory = False
+        # Forget the stacks of every thread, spans still open are not popped from the new ones
+        self.__local = threading.local()
+
+    def reset(self):
+        '''Clear recorded statistics.
+        '''
+        self.__stats.clear()
+
+    def span(self,
+             name: str,
+             key: Optional[str] = None):
+        '''Returns a context manager which records the duration of its block.
+
+        :param name: Name of the span, e.g. 'ConfigLoader._read_config'.
+        :type name: str
+
+        :param key: Key to aggregate by within the name, e.g. a file name.
+        :type key: str, optional, defaults to None
+
+        '''
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, key)
+
+    def record(self,
+               name: str,
+               key: Optional[str],
+               duration_ns: int,
+               peak_bytes: Optional[int] = 0):
+        stats = self.__stats.get((name, key))
+        if stats is None:
+            self.__stats[(name, key)] = [1, duration_ns, duration_ns, peak_bytes]
+        else:
+            stats[0] += 1
+            stats[1] += duration_ns
+            stats[2] = max(stats[2], duration_ns)
+            stats[3] = max(stats[3], peak_bytes)
+
+    def stats(self) -> List[dict]:
+        '''Returns recorded statistics sorted by total time, slowest first.
+
+        :rtype: list
+        :return: [{'name', 'key', 'count', 'total_ms', 'mean_ms', 'max_ms', 'peak_kb'}]
+
+        '''
+        rows = list()
+        for (name, key), (count, total_ns, max_ns, peak_bytes) in self.__stats.items():
+            row = {'name': name,
+                   'key': key,
+                   'count': count,
+                   'total_ms': round(total_ns / 1e6, 3),
+                   'mean_ms': round(total_ns / count / 1e6, 3),
+                   'max_ms': round(max_ns / 1e6, 3)}
+            if self.trace_memory or peak_bytes:
+                row['peak_kb'] = round(peak_bytes / 1024, 1)
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def report(self,
+               log_collector,
+               level: Optional[str] = 'info'):
+        '''Report recorded statistics through a LogCollector, one entry per span name and key.
+
+        :param log_collector: Log collector to report to.
+        :type log_collector: util.logger.LogCollector
+
+        :param level: Level of log.
+        :type level: str, optional, defaults to 'info'
+
+        '''
+        for row in self.stats():
+            log_collector.collect(level, row)
+
+
+instrumentation = Instrumentation()
+if os.environ.get('CONFIG_INSTRUMENTATION', '').lower() in ('time', 'memory'):
+    instrumentation.enable(trace_memory=os.environ['CONFIG_INSTRUMENTATION'].lower() == 'memory')
+
+
+def span(name: str,
+         key: Optional[str] = None):
+    '''Returns a span of the module instrumentation, see Instrumentation.span.
+    '''
+    return instrumentation.span(name, key)
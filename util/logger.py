@@ -1,12 +1,32 @@
 import os
+import json
 import logging
 import datetime
+import threading
 from typing import Optional, Literal
-import pytz
+
+_orjson = None
+
+
+def _import_orjson():
+    '''Returns the orjson module, or False if it is not installed. Imported on the first JSON record.
+    '''
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+            _orjson = orjson
+        except ImportError:
+            _orjson = False
+    return _orjson
 
 
 class Formatter(logging.Formatter):
     '''override logging.Formatter to use an aware datetime object.
+
+    The timezone object is resolved once and the formatted time is cached per second,
+    so records logged within the same second only format their milliseconds.
+    Handlers of several threads may share one formatter, the cache is replaced as a whole under a lock.
     '''
     def __init__(self,
                  fmt=None,
@@ -17,28 +37,110 @@ class Formatter(logging.Formatter):
                                    fmt=fmt,
                                    datefmt=datefmt,
                                    style=style)
+        # pytz is slow to import, it is only imported once a formatter is created
+        import pytz
         self.timezone = timezone
+        self.tzinfo = pytz.timezone(timezone)
+        # (second, datefmt, part before the milliseconds, part after or None), read without the lock
+        self.__cached_time = (None, None, None, None)
+        self.__cache_lock = threading.Lock()
 
     def converter(self,
                   timestamp):
-        dt = datetime.datetime.fromtimestamp(timestamp,
-                                             tz=pytz.timezone('utc'))
-        tzinfo = pytz.timezone(self.timezone)
-        dt = dt.astimezone(tzinfo)
-        return dt
+        return datetime.datetime.fromtimestamp(timestamp,
+                                               tz=self.tzinfo)
 
     def formatTime(self,
                    record,
                    datefmt=None):
-        dt = self.converter(record.created)
-        if datefmt:
-            s = dt.strftime(datefmt)
-        else:
+        second = int(record.created)
+        if datefmt and '%f' in datefmt:
+            return self.converter(record.created).strftime(datefmt)
+
+        cached_time = self.__cached_time
+        if second != cached_time[0] or datefmt != cached_time[1]:
+            with self.__cache_lock:
+                dt = self.converter(second)
+                if datefmt:
+                    cached_time = (second, datefmt, dt.strftime(datefmt), None)
+                else:
+                    # Split '2001-01-01T00:00:00+07:00' into the part before and after the milliseconds
+                    s = dt.isoformat(timespec='seconds')
+                    cached_time = (second, datefmt, s[:19], s[19:])
+                self.__cached_time = cached_time
+
+        prefix, suffix = cached_time[2:]
+        if suffix is None:
+            return prefix
+        return f'{prefix}.{int(record.msecs):03d}{suffix}'
+
+
+class JsonFormatter(Formatter):
+    '''Format each record as one JSON object per line.
+
+    Dict and list messages are serialized natively instead of as their ``str()``.
+    orjson is used as the encoder when installed, otherwise the standard json module.
+    '''
+    def format(self,
+               record):
+        message = record.msg
+        if record.args or not isinstance(message, (dict, list)):
+            message = record.getMessage()
+
+        log_record = {'asctime': self.formatTime(record, self.datefmt),
+                      'levelname': record.levelname,
+                      'name': record.name,
+                      'message': message}
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_record['exc_info'] = record.exc_text
+        if record.stack_info:
+            log_record['stack_info'] = self.formatStack(record.stack_info)
+
+        return self.encode(log_record)
+
+    @staticmethod
+    def encode(log_record: dict) -> str:
+        orjson = _import_orjson()
+        if orjson:
             try:
-                s = dt.isoformat(timespec='milliseconds')
+                return orjson.dumps(log_record,
+                                    default=str,
+                                    option=orjson.OPT_NON_STR_KEYS).decode()
             except TypeError:
-                s = dt.isoformat()
-        return s
+                # e.g. integers larger than 64 bits, fall back to the standard encoder
+                pass
+        try:
+            return json.dumps(log_record,
+                              default=str,
+                              ensure_ascii=False)
+        except (TypeError, ValueError):
+            # e.g. tuple keys, which neither encoder accepts
+            pass
+        try:
+            return json.dumps(_stringify_keys(log_record),
+                              default=str,
+                              ensure_ascii=False)
+        except (TypeError, ValueError, RecursionError):
+            # e.g. a circular reference, never drop the record
+            log_record['message'] = str(log_record['message'])
+            return json.dumps(log_record,
+                              default=str,
+                              ensure_ascii=False)
+
+
+def _stringify_keys(value):
+    '''Returns value with every dictionary key that JSON cannot encode replaced by its str().
+    '''
+    if isinstance(value, dict):
+        return {key if isinstance(key, (str, int, float, bool)) or key is None else str(key): _stringify_keys(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_stringify_keys(item) for item in value]
+    return value
 
 
 class LogCollector():
@@ -72,6 +174,10 @@ class LogCollector():
                              Check the format syntax in: https://strftime.org/
     :type dt_prefix_format: str, optional, defaults to '%Y%m%d%H'
 
+    :param log_format: Output format, 'text' writes '%(asctime)s - %(levelname)s - %(name)s - %(message)s' lines,
+                       'json' writes one JSON object per record.
+    :type log_format: Literal['text', 'json'], optional, defaults to 'text'
+
     '''
 
     def __init__(self,
@@ -83,12 +189,14 @@ class LogCollector():
                  log_dir: Optional[str] = 'log/',
                  log_file_name: Optional[str] = 'log',
                  add_log_file_name_dt_prefix: Optional[bool] = True,
-                 dt_prefix_format: Optional[str] = '%Y%m%d%H'):
+                 dt_prefix_format: Optional[str] = '%Y%m%d%H',
+                 log_format: Optional[Literal['text', 'json']] = 'text'):
 
         self.__default_dir = os.path.dirname(os.path.realpath(__file__)).rsplit(os.path.sep, 1)[0]
         self.__dir = os.path.join(self.__default_dir, *f'{log_dir}'.split('/'))
 
         if add_log_file_name_dt_prefix:
+            import pytz
             self.__date_now = datetime.datetime.now(pytz.timezone(time_zone)).strftime(dt_prefix_format)
             self.__path = os.path.join(self.__dir, f'{str(self.__date_now)}_{log_file_name}')
         else:
@@ -96,6 +204,7 @@ class LogCollector():
 
         self.__logger_name = logger_name
         self.__log_format = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+        self.__json_log = log_format == 'json'
 
         # DEBUG > INFO > WARNING > ERROR > CRITICAL
 
@@ -112,7 +221,10 @@ class LogCollector():
             self.__log_level_print = logging.DEBUG
             self.__log_level_file = logging.DEBUG
 
-        handler_format = Formatter(self.__log_format, timezone=time_zone)
+        if self.__json_log:
+            handler_format = JsonFormatter(timezone=time_zone)
+        else:
+            handler_format = Formatter(self.__log_format, timezone=time_zone)
 
         # Create logger
         self.logger = logging.getLogger(self.__logger_name)
@@ -171,6 +283,8 @@ class LogCollector():
 
         if isinstance(message, str):
             printer(message)
+        elif self.__json_log:
+            printer(message)
         else:
             obj_str = message.__str__()
             message = '\n' + obj_str